@@ -0,0 +1,138 @@
+"""Cooperative cancellation and deadlines.
+
+A request's work stops when:
+
+- the client disconnects, or
+- its deadline passes. The deadline is the earliest of the
+  `X-Kit-Deadline-Ms` request header (a budget in milliseconds), the tool's
+  `max_runtime_s` contract field, and `KIT_MAX_RUNTIME_S`.
+
+The registry and proxy create a `CancelToken` per request and watch for
+disconnects. Tool code reads the token with `current_token()` and calls
+`check()` between Ralph Loop phases or walk batches; `check()` raises
+`Cancelled`. The tool contract (`run(payload)`) is unchanged.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Mapping, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEADLINE_HEADER = "x-kit-deadline-ms"
+
+CLIENT_DISCONNECTED = "client_disconnected"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+
+class Cancelled(Exception):
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    def __init__(self, deadline: Optional[float] = None) -> None:
+        # `deadline` is a time.monotonic() timestamp.
+        self.deadline = deadline
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if self._reason is None:
+            self._reason = reason
+
+    @property
+    def cancelled(self) -> bool:
+        if self._reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self._reason = DEADLINE_EXCEEDED
+        return self._reason is not None
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._reason if self.cancelled else None
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise Cancelled(self._reason or "cancelled")
+
+
+# Returned when no request token is active; never cancelled.
+_NEVER = CancelToken()
+_current: ContextVar[Optional[CancelToken]] = ContextVar("kit_cancel_token", default=None)
+
+
+def current_token() -> CancelToken:
+    return _current.get() or _NEVER
+
+
+@contextmanager
+def use_token(token: CancelToken) -> Iterator[CancelToken]:
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def request_deadline(headers: Mapping[str, str], max_runtime_s: Optional[float] = None) -> Optional[float]:
+    """Earliest of the header budget, the contract limit and `KIT_MAX_RUNTIME_S`."""
+
+    budgets = []
+    raw = headers.get(DEADLINE_HEADER)
+    if raw:
+        try:
+            budgets.append(max(0.0, float(raw) / 1000))
+        except ValueError:
+            pass
+    if max_runtime_s:
+        budgets.append(float(max_runtime_s))
+    env = os.getenv("KIT_MAX_RUNTIME_S")
+    if env:
+        try:
+            budgets.append(max(0.0, float(env)))
+        except ValueError:
+            pass
+    return time.monotonic() + min(budgets) if budgets else None
+
+
+async def watch_disconnect(request: Any, token: CancelToken, interval: float = 0.05) -> None:
+    """Cancel `token` once the client behind `request` goes away."""
+
+    while not token.cancelled:
+        if await request.is_disconnected():
+            token.cancel(CLIENT_DISCONNECTED)
+            return
+        await asyncio.sleep(interval)
+
+
+async def until_cancelled(request: Any, token: CancelToken, awaitable: Awaitable[T]) -> T:
+    """Await `awaitable` unless the client disconnects or the deadline passes first.
+
+    On cancellation the awaitable's task is cancelled and `Cancelled` raised.
+    """
+
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(watch_disconnect(request, token))
+    try:
+        done, _pending = await asyncio.wait(
+            {task, watcher}, timeout=token.remaining(), return_when=asyncio.FIRST_COMPLETED
+        )
+        if task in done:
+            return task.result()
+        task.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await task
+        token.check()
+        raise Cancelled(token.reason or "cancelled")
+    finally:
+        watcher.cancel()
@@ -0,0 +1,219 @@
+"""Negotiated response compression (zstd, brotli, gzip).
+
+A pure ASGI middleware, so streamed responses (SSE, chunked proxy bodies)
+are compressed chunk by chunk and flushed after every chunk instead of
+being buffered.
+
+- The encoding is picked from `Accept-Encoding` (q-values respected); on a
+  tie the order is zstd > br > gzip. zstd needs `zstandard` and brotli needs
+  `brotli`; both are optional, and gzip is always available.
+- Complete bodies smaller than `KIT_COMPRESS_MIN_BYTES` (default 1024) are
+  sent as-is. Streamed bodies are always compressed, because their final size
+  isn't known when the headers go out.
+- Only textual content types are compressed. Responses that already have a
+  `Content-Encoding` pass through untouched.
+- `KIT_COMPRESS_LEVEL` overrides the level of the chosen codec.
+"""
+
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # optional
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None  # type: ignore[assignment]
+
+try:  # optional
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None  # type: ignore[assignment]
+
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class _Encoder(Protocol):
+    """Incremental compressor: `chunk()` returns flushed output."""
+
+    def chunk(self, data: bytes) -> bytes:
+        ...
+
+    def finish(self, data: bytes = b"") -> bytes:
+        ...
+
+
+class _GzipEncoder:
+    def __init__(self, level: Optional[int]) -> None:
+        self._c = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: Optional[int]) -> None:
+        self._c = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: Optional[int]) -> None:
+        self._c = brotli.Compressor(quality=4 if level is None else level)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+def available_encodings() -> Dict[str, Callable[[Optional[int]], _Encoder]]:
+    """Supported encodings in server preference order."""
+
+    out: Dict[str, Callable[[Optional[int]], _Encoder]] = {}
+    if zstandard is not None:
+        out["zstd"] = _ZstdEncoder
+    if brotli is not None:
+        out["br"] = _BrotliEncoder
+    out["gzip"] = _GzipEncoder
+    return out
+
+
+def _parse_accept_encoding(value: str) -> Dict[str, float]:
+    prefs: Dict[str, float] = {}
+    for part in value.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        prefs[token] = q
+    return prefs
+
+
+def negotiate(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """Pick the best supported encoding for an `Accept-Encoding` value."""
+
+    prefs = _parse_accept_encoding(accept_encoding)
+    wildcard = prefs.get("*", 0.0)
+    best: Optional[Tuple[float, int, str]] = None
+    for rank, name in enumerate(supported):
+        q = prefs.get(name, wildcard)
+        if q <= 0:
+            continue
+        key = (q, -rank, name)
+        if best is None or key > best:
+            best = key
+    return best[2] if best else None
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    ctype = headers.get("content-type", "").lower()
+    return ctype.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, *, minimum_size: Optional[int] = None, level: Optional[int] = None) -> None:
+        self.app = app
+        self.minimum_size = (
+            int(os.getenv("KIT_COMPRESS_MIN_BYTES", "1024")) if minimum_size is None else minimum_size
+        )
+        env_level = os.getenv("KIT_COMPRESS_LEVEL")
+        self.level = level if level is not None else (int(env_level) if env_level else None)
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), list(self.encodings))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding)(scope, receive, send)
+
+
+class _CompressedResponder:
+    def __init__(self, mw: CompressionMiddleware, encoding: str) -> None:
+        self.mw = mw
+        self.encoding = encoding
+        self.start: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.mw.app(scope, receive, self._send)
+
+    def _begin(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+        self.encoder = self.mw.encodings[self.encoding](self.mw.level)
+
+    async def _send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = not _compressible(headers)
+            if self.passthrough:
+                await self.send(message)
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        assert self.start is not None
+
+        if self.encoder is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            if not more and len(body) < self.mw.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self._begin(headers)
+            if not more:
+                data = self.encoder.finish(body)  # type: ignore[union-attr]
+                headers["Content-Length"] = str(len(data))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            await self.send(self.start)
+
+        assert self.encoder is not None
+        data = self.encoder.chunk(body) if more else self.encoder.finish(body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more})
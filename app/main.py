@@ -1,48 +1,175 @@
+import asyncio
 import os
-from typing import Dict
+import time
+from contextlib import ExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
 
-import requests
+import anyio
+import httpx
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, Response
-
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import state, tracing
+from app.cancellation import (
+    CLIENT_DISCONNECTED,
+    DEADLINE_EXCEEDED,
+    DEADLINE_HEADER,
+    Cancelled,
+    CancelToken,
+    request_deadline,
+    until_cancelled,
+)
+from app.compression import CompressionMiddleware
+from app.ratelimit import AdmissionMiddleware
+from app.modules import registry
 from app.modules.registry import router as module_router
 
-app = FastAPI(title="Kit Middleware")
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    registry.discover_tools()
+    registry.prewarm()
+    yield
+    if _UPSTREAM is not None:
+        await _UPSTREAM[1].aclose()
+    registry.save_manifest_cache()
+    # Flush this worker's buffered metrics before it exits.
+    state.reset_state()
+
+
+app = FastAPI(title="Kit Middleware", lifespan=lifespan)
+
+
+def _count_response(status_code: int) -> None:
+    shared = state.get_state()
+    shared.incr("http.requests")
+    shared.incr(f"http.status.{status_code // 100}xx")
+
+
+class AtomicErrorMiddleware:
+    """Trace/profile every request and turn escaped errors into Atomic Era JSON.
+
+    A plain ASGI middleware rather than `@app.middleware("http")`: Starlette's
+    BaseHTTPMiddleware hides client disconnects from endpoints, which breaks
+    cancellation (see `app.cancellation`).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        profile_mode = tracing.requested_profile_mode(request.headers)
+        started = False
+        try:
+            with tracing.trace_request(
+                "http.request",
+                force=profile_mode is not None,
+                method=request.method,
+                path=str(request.url.path),
+            ) as root:
+                with ExitStack() as profiling:
+                    prof = profiling.enter_context(tracing.profile(profile_mode))
+
+                    async def send_wrapper(message: Message) -> None:
+                        nonlocal started
+                        if message["type"] == "http.response.start":
+                            started = True
+                            # Headers go out now, so the profile ends here.
+                            profiling.close()
+                            status_code = int(message["status"])
+                            headers = MutableHeaders(scope=message)
+                            _count_response(status_code)
+                            if root is not None:
+                                root.set(status_code=status_code)
+                                timing = tracing.server_timing(root)
+                                if timing:
+                                    headers["Server-Timing"] = tracing.header_safe(timing)
+                            if prof.get("summary"):
+                                headers[tracing.PROFILE_SUMMARY_HEADER] = tracing.header_safe(prof["summary"])
+                        await send(message)
+
+                    await self.app(scope, receive, send_wrapper)
+        except httpx.RequestError as exc:
+            if started:
+                raise
+            # Proxy/network failure
+            response = JSONResponse(
+                status_code=502,
+                content={
+                    "error": "Gee Whiz! Something went wrong!",
+                    "detail": "Couldn't reach the Kit Engine (Open WebUI).",
+                    "hint": "Is the Docker container running and reachable from this host?",
+                    "path": str(request.url.path),
+                    "exception": str(exc),
+                },
+            )
+            _count_response(response.status_code)
+            await response(scope, receive, send)
+        except Exception as exc:
+            if started:
+                raise
+            # Catch-all
+            response = JSONResponse(
+                status_code=500,
+                content={
+                    "error": "Jumpin' Jupiter!",
+                    "detail": "Unexpected trouble in Kit Middleware.",
+                    "path": str(request.url.path),
+                    "exception": str(exc),
+                },
+            )
+            _count_response(response.status_code)
+            await response(scope, receive, send)
 
-@app.middleware("http")
-async def atomic_error_middleware(request: Request, call_next):
-    try:
-        return await call_next(request)
-    except requests.RequestException as exc:
-        # Proxy/network failure
-        return JSONResponse(
-            status_code=502,
-            content={
-                "error": "Gee Whiz! Something went wrong!",
-                "detail": "Couldn't reach the Kit Engine (Open WebUI).",
-                "hint": "Is the Docker container running and reachable from this host?",
-                "path": str(request.url.path),
-                "exception": str(exc),
-            },
-        )
-    except Exception as exc:
-        # Catch-all
-        return JSONResponse(
-            status_code=500,
-            content={
-                "error": "Jumpin' Jupiter!",
-                "detail": "Unexpected trouble in Kit Middleware.",
-                "path": str(request.url.path),
-                "exception": str(exc),
-            },
-        )
 
 @app.get("/")
 async def root():
     return {"message": "Kit is purring. Atomic Era Middleware Active."}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Counters aggregated across all workers (see `app.state`)."""
+
+    return {"worker_pid": os.getpid(), "metrics": state.get_state().metrics()}
+
+
+_UPSTREAM: Optional[Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = None
+RELAY_CHUNK_BYTES = 1024 * 1024
+
+
+def _upstream_client() -> httpx.AsyncClient:
+    """One pooled client per event loop (each worker has its own)."""
+
+    global _UPSTREAM
+    loop = asyncio.get_running_loop()
+    if _UPSTREAM is None or _UPSTREAM[0] is not loop:
+        _UPSTREAM = (loop, httpx.AsyncClient(timeout=float(os.getenv("OPENWEBUI_PROXY_TIMEOUT", "30"))))
+    return _UPSTREAM[1]
+
+
+def _cancelled_response(reason: str, path: str) -> JSONResponse:
+    state.get_state().incr(f"cancelled.proxy.{reason}")
+    if reason == DEADLINE_EXCEEDED:
+        return JSONResponse(
+            status_code=504,
+            content={
+                "error": "Time's up, Daddy-O!",
+                "detail": "The Kit Engine didn't answer before the request deadline.",
+                "path": path,
+            },
+        )
+    # The client is gone; nobody reads this.
+    return JSONResponse(status_code=499, content={"error": "client disconnected", "path": path})
+
+
 @app.api_route(
     "/proxy/{full_path:path}",
     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
@@ -52,8 +179,11 @@ async def proxy_to_openwebui(request: Request, full_path: str):
 
     Contract:
     - Input: any HTTP request to /proxy/*
-    - Output: same response body/status from Open WebUI
+    - Output: same response body/status from Open WebUI, streamed through
     - Error: Atomic Era JSON message with helpful hints
+
+    The upstream call is aborted when the client disconnects or the request
+    deadline (`X-Kit-Deadline-Ms`, `KIT_MAX_RUNTIME_S`) passes.
     """
 
     base_url = os.getenv("OPENWEBUI_BASE_URL", "http://localhost:3000").rstrip("/")
@@ -67,23 +197,57 @@ async def proxy_to_openwebui(request: Request, full_path: str):
     headers: Dict[str, str] = {
         k: v
         for k, v in request.headers.items()
-        if k.lower() not in {"host", "content-length"}
+        if k.lower() not in {"host", "content-length", DEADLINE_HEADER}
     }
 
-    body = await request.body()
-
-    resp = requests.request(
-        method=request.method,
-        url=target_url,
-        headers=headers,
-        data=body if body else None,
-        timeout=float(os.getenv("OPENWEBUI_PROXY_TIMEOUT", "30")),
-    )
-
-    return Response(
-        content=resp.content,
-        status_code=resp.status_code,
-        media_type=resp.headers.get("content-type"),
-    )
+    token = CancelToken(deadline=request_deadline(request.headers))
+
+    with tracing.span("proxy.read_body") as sp:
+        body = await request.body()
+        if sp is not None:
+            sp.set(bytes=len(body))
+
+    client = _upstream_client()
+    upstream = client.build_request(request.method, target_url, headers=headers, content=body or None)
+    with tracing.span("proxy.upstream", method=request.method, url=target_url) as sp:
+        t0 = time.perf_counter()
+        try:
+            resp = await until_cancelled(request, token, client.send(upstream, stream=True))
+        except Cancelled as exc:
+            return _cancelled_response(exc.reason, str(request.url.path))
+        if sp is not None:
+            sp.set(status_code=resp.status_code, headers_ms=round((time.perf_counter() - t0) * 1000, 3))
+
+    # Fixed-length bodies are relayed in large chunks; streams of unknown
+    # length (SSE) are passed on as each read arrives.
+    length = resp.headers.get("content-length")
+    chunk_size = min(int(length), RELAY_CHUNK_BYTES) if length and length.isdigit() and int(length) else None
+
+    async def relay() -> AsyncIterator[bytes]:
+        finished = False
+        try:
+            async for chunk in resp.aiter_bytes(chunk_size):
+                if token.cancelled:
+                    break
+                yield chunk
+            finished = not token.cancelled
+        finally:
+            # Runs on client disconnect too (the stream task is cancelled);
+            # closing the response aborts the upstream request.
+            with anyio.CancelScope(shield=True):
+                await resp.aclose()
+            if not finished:
+                state.get_state().incr(f"cancelled.proxy.{token.reason or CLIENT_DISCONNECTED}")
+
+    with tracing.span("proxy.build_response"):
+        return StreamingResponse(
+            relay(),
+            status_code=resp.status_code,
+            media_type=resp.headers.get("content-type"),
+        )
 
 app.include_router(module_router, prefix="/modules")
+app.add_middleware(AtomicErrorMiddleware)
+app.add_middleware(AdmissionMiddleware)
+# Outermost, so error pages and tracing headers are covered too.
+app.add_middleware(CompressionMiddleware)
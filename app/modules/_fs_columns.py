@@ -0,0 +1,101 @@
+"""Columnar storage for Filesystem Triage scan results.
+
+A scan can hold hundreds of thousands of files, so instead of one object per
+file (a dataclass with a full path string costs ~270 bytes) the results are
+kept in parallel, array-backed columns:
+
+- `dirs`: each directory path is stored once; files refer to it by index
+  (`dir_ids`, `array('i')`).
+- basenames: file names encoded with `os.fsencode` and packed into a single
+  `bytearray`, with end offsets in `array('q')`.
+- `sizes` and `mtimes_ns`: `array('q')`.
+
+Paths are rebuilt only for the handful of files that make it into a result.
+Top-N selection uses NumPy's argpartition when it is installed (optional
+dependency) and `heapq` otherwise; both break ties by scan order, so they
+return the same rows.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+from array import array
+from typing import Dict, List, Sequence
+
+try:  # optional
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None  # type: ignore[assignment]
+
+BACKEND = "numpy" if np is not None else "array"
+
+
+class FileColumns:
+    def __init__(self) -> None:
+        self.dirs: List[str] = []
+        self._dir_index: Dict[str, int] = {}
+        self.dir_ids = array("i")
+        self._names = bytearray()
+        self._name_ends = array("q")
+        self.sizes = array("q")
+        self.mtimes_ns = array("q")
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def dir_id(self, path: str) -> int:
+        """Intern a directory path and return its id."""
+
+        idx = self._dir_index.get(path)
+        if idx is None:
+            idx = len(self.dirs)
+            self.dirs.append(path)
+            self._dir_index[path] = idx
+        return idx
+
+    def append(self, dir_id: int, name: str, size: int, mtime_ns: int) -> None:
+        self.dir_ids.append(dir_id)
+        self._names += os.fsencode(name)
+        self._name_ends.append(len(self._names))
+        self.sizes.append(size)
+        self.mtimes_ns.append(mtime_ns)
+
+    def name(self, i: int) -> str:
+        start = self._name_ends[i - 1] if i else 0
+        return os.fsdecode(bytes(self._names[start : self._name_ends[i]]))
+
+    def path(self, i: int) -> str:
+        return os.path.join(self.dirs[self.dir_ids[i]], self.name(i))
+
+    def total_bytes(self) -> int:
+        if np is not None and len(self):
+            return int(np.frombuffer(self.sizes, dtype=np.int64).sum())
+        return sum(self.sizes)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (excluding interned dirs)."""
+
+        arrays: Sequence[array] = (self.dir_ids, self._name_ends, self.sizes, self.mtimes_ns)
+        return len(self._names) + sum(a.itemsize * len(a) for a in arrays)
+
+    def top_indices(self, column: array, n: int, *, largest: bool) -> List[int]:
+        """Row indices of the `n` largest (or smallest) values of `column`."""
+
+        count = len(column)
+        n = min(n, count)
+        if n <= 0:
+            return []
+        if np is not None:
+            keys = np.frombuffer(column, dtype=np.int64)
+            if largest:
+                keys = -keys
+            # Partition instead of a full sort: everything strictly before the
+            # n-th key, then the earliest rows tied with it, as heapq picks.
+            kth = keys[np.argpartition(keys, n - 1)[n - 1]]
+            before = np.flatnonzero(keys < kth)
+            tied = np.flatnonzero(keys == kth)[: n - len(before)]
+            rows = np.concatenate((before, tied))
+            return [int(i) for i in rows[np.lexsort((rows, keys[rows]))]]
+        pick = heapq.nlargest if largest else heapq.nsmallest
+        return pick(n, range(count), key=column.__getitem__)
@@ -0,0 +1,471 @@
+"""Persistent SQLite header index for the Inbox Cleaner tool.
+
+One database can hold many mailboxes. Each message row is keyed by
+(mailbox, uid), where uid is the Maildir unique name (filename without the
+`:2,FLAGS` suffix) or the mbox byte offset, and carries a hash of the raw
+header block.
+
+Resync is incremental:
+- Maildir: files whose uid and size are already indexed are not opened (nor
+  stat'ed when the name carries `,S=<size>`); flag changes (renames) only
+  update `key`/`flags`.
+- mbox: boundaries are re-found through the mmap and each header block is
+  hashed; only offsets whose hash changed are re-parsed. An mbox that only
+  grew (the common case) is rescanned from its last indexed message.
+
+`sender_totals` is maintained by triggers so "top senders by bytes" is an
+index lookup rather than a GROUP BY over every message.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.cancellation import CancelToken
+
+from ._mailbox import (
+    MessageHeader,
+    iter_maildir_files,
+    iter_mbox_spans,
+    maildir_flags,
+    maildir_size_hint,
+    maildir_uid,
+    mbox_header_slice,
+    mbox_message,
+    open_mbox,
+    read_maildir_message,
+)
+
+
+SCHEMA_VERSION = 1
+BATCH = 5000
+# Syncs commit per BATCH, so a writer waits at most about one page for
+# another; past this the caller reports the index as busy.
+BUSY_TIMEOUT_S = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0,
+    last_pos INTEGER NOT NULL DEFAULT -1,
+    synced_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    mailbox_id INTEGER NOT NULL,
+    uid TEXT NOT NULL,
+    pos INTEGER NOT NULL DEFAULT 0,
+    key TEXT NOT NULL,
+    hash BLOB,
+    sender TEXT NOT NULL,
+    list_id TEXT NOT NULL,
+    date REAL NOT NULL,
+    size INTEGER NOT NULL,
+    flags TEXT NOT NULL,
+    bulk INTEGER NOT NULL,
+    list_unsub INTEGER NOT NULL,
+    PRIMARY KEY (mailbox_id, uid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_sender ON messages (mailbox_id, sender, bulk, date, size);
+CREATE INDEX IF NOT EXISTS messages_age ON messages (mailbox_id, bulk, date);
+CREATE TABLE IF NOT EXISTS sender_totals (
+    mailbox_id INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    bulk INTEGER NOT NULL,
+    list_unsub INTEGER NOT NULL,
+    PRIMARY KEY (mailbox_id, sender)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sender_totals_bytes ON sender_totals (mailbox_id, bytes);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO sender_totals (mailbox_id, sender, messages, bytes, bulk, list_unsub)
+    VALUES (NEW.mailbox_id, NEW.sender, 1, NEW.size, NEW.bulk, NEW.list_unsub)
+    ON CONFLICT (mailbox_id, sender) DO UPDATE SET
+        messages = messages + 1,
+        bytes = bytes + NEW.size,
+        bulk = bulk + NEW.bulk,
+        list_unsub = list_unsub + NEW.list_unsub;
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    UPDATE sender_totals SET
+        messages = messages - 1,
+        bytes = bytes - OLD.size,
+        bulk = bulk - OLD.bulk,
+        list_unsub = list_unsub - OLD.list_unsub
+    WHERE mailbox_id = OLD.mailbox_id AND sender = OLD.sender;
+    DELETE FROM sender_totals
+    WHERE mailbox_id = OLD.mailbox_id AND sender = OLD.sender AND messages <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au_size AFTER UPDATE OF size ON messages BEGIN
+    UPDATE sender_totals SET bytes = bytes + NEW.size - OLD.size
+    WHERE mailbox_id = NEW.mailbox_id AND sender = NEW.sender;
+END;
+"""
+
+
+def default_index_path() -> Path:
+    return Path(os.getenv("KIT_INBOX_INDEX", "~/.cache/kit/inbox_index.sqlite")).expanduser()
+
+
+def is_busy(exc: sqlite3.OperationalError) -> bool:
+    """True when `exc` means another connection holds the index's write lock."""
+
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(exc) or "busy" in str(exc)
+
+
+def _digest(raw: bytes) -> bytes:
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def _row(mailbox_id: int, uid: str, pos: int, h: MessageHeader, digest: bytes) -> Tuple[Any, ...]:
+    return (
+        mailbox_id,
+        uid,
+        pos,
+        h.key,
+        digest,
+        h.sender,
+        h.list_id,
+        h.date,
+        h.size_bytes,
+        h.flags,
+        int(h.bulk),
+        int(h.list_unsubscribe),
+    )
+
+
+def _candidate_sql(bulk_only: bool) -> str:
+    bulk = "bulk = 1 AND " if bulk_only else ""
+    return f"mailbox_id = ? AND {bulk}date <= ? AND size >= ?"
+
+
+class HeaderIndex:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path is not None else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_S)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA temp_store=MEMORY")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError(f"Unsupported inbox index schema v{version}: {self.path}")
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "HeaderIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # --- sync ---
+
+    def mailbox_id(self, root: Path, fmt: str) -> int:
+        self.db.execute(
+            "INSERT INTO mailboxes (path, format) VALUES (?, ?) ON CONFLICT (path) DO NOTHING",
+            (str(root), fmt),
+        )
+        return int(self.db.execute("SELECT id FROM mailboxes WHERE path = ?", (str(root),)).fetchone()[0])
+
+    def sync(self, root: Path, fmt: str, token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """Bring the index for one mailbox up to date; returns sync stats.
+
+        Work is committed per BATCH so other mailboxes' syncs (and other
+        workers) never wait on a whole first sync. An interrupted sync leaves
+        the committed pages in place and the next one picks up from there.
+        `token` is checked once per BATCH; `Cancelled` propagates.
+        """
+
+        t0 = time.perf_counter()
+        try:
+            with self.db:
+                mid = self.mailbox_id(root, fmt)
+            if fmt == "maildir":
+                stats = self._sync_maildir(mid, root, token)
+            else:
+                stats = self._sync_mbox(mid, root, token)
+            self.db.commit()
+        except BaseException:
+            self.db.rollback()
+            raise
+        stats["mailbox_id"] = mid
+        stats["sync_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        return stats
+
+    def _reset_seen(self) -> None:
+        self.db.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS seen ("
+            "uid TEXT PRIMARY KEY, pos INTEGER, key TEXT, size INTEGER, hash BLOB, flags TEXT, need INTEGER DEFAULT 0"
+            ") WITHOUT ROWID"
+        )
+        self.db.execute("DELETE FROM seen")
+
+    def _fill_seen(self, rows: Iterable[Tuple[Any, ...]], token: Optional[CancelToken] = None) -> int:
+        n = 0
+        batch: List[Tuple[Any, ...]] = []
+        for r in rows:
+            batch.append(r)
+            if len(batch) >= BATCH:
+                if token is not None:
+                    token.check()
+                self.db.executemany("INSERT OR REPLACE INTO seen (uid, pos, key, size, hash, flags) VALUES (?, ?, ?, ?, ?, ?)", batch)
+                n += len(batch)
+                batch.clear()
+        if batch:
+            self.db.executemany("INSERT OR REPLACE INTO seen (uid, pos, key, size, hash, flags) VALUES (?, ?, ?, ?, ?, ?)", batch)
+            n += len(batch)
+        return n
+
+    def _reconcile(self, mid: int, *, compare: str) -> Dict[str, int]:
+        """Diff `seen` against `messages`; mark rows in `seen` that need parsing.
+
+        `compare` is the column that decides whether an indexed row is stale:
+        `size` for Maildir (files are immutable), `hash` for mbox.
+        """
+
+        removed = self.db.execute(
+            f"DELETE FROM messages WHERE mailbox_id = ? AND ("
+            f"uid NOT IN (SELECT uid FROM seen) OR "
+            f"EXISTS (SELECT 1 FROM seen s WHERE s.uid = messages.uid AND s.{compare} IS NOT messages.{compare}))",
+            (mid,),
+        ).rowcount
+        moved = self.db.execute(
+            "UPDATE messages SET "
+            "key = (SELECT key FROM seen s WHERE s.uid = messages.uid), "
+            "flags = (SELECT flags FROM seen s WHERE s.uid = messages.uid), "
+            "size = (SELECT size FROM seen s WHERE s.uid = messages.uid) "
+            "WHERE mailbox_id = ? AND EXISTS (SELECT 1 FROM seen s WHERE s.uid = messages.uid AND "
+            "(s.key IS NOT messages.key OR s.flags IS NOT messages.flags OR s.size IS NOT messages.size))",
+            (mid,),
+        ).rowcount
+        need = self.db.execute(
+            "UPDATE seen SET need = 1 WHERE uid NOT IN (SELECT uid FROM messages WHERE mailbox_id = ?)",
+            (mid,),
+        ).rowcount
+        self.db.commit()
+        return {"removed": removed, "updated": moved, "to_parse": need}
+
+    def _iter_need(
+        self, token: Optional[CancelToken] = None
+    ) -> Iterable[List[Tuple[str, int, str, int, Optional[bytes]]]]:
+        last = ""
+        while True:
+            if token is not None:
+                token.check()
+            page = self.db.execute(
+                "SELECT uid, pos, key, size, hash FROM seen WHERE need = 1 AND uid > ? ORDER BY uid LIMIT ?",
+                (last, BATCH),
+            ).fetchall()
+            if not page:
+                return
+            yield page
+            last = page[-1][0]
+
+    def _insert(self, rows: List[Tuple[Any, ...]]) -> None:
+        self.db.executemany(
+            "INSERT OR REPLACE INTO messages "
+            "(mailbox_id, uid, pos, key, hash, sender, list_id, date, size, flags, bulk, list_unsub) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.db.commit()
+
+    def _sync_maildir(self, mid: int, root: Path, token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        self._reset_seen()
+
+        def listing() -> Iterable[Tuple[Any, ...]]:
+            for key, entry in iter_maildir_files(root):
+                size = maildir_size_hint(entry.name)
+                if size is None:
+                    try:
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                yield (maildir_uid(entry.name), 0, key, int(size), None, maildir_flags(entry.name))
+
+        listed = self._fill_seen(listing(), token)
+        stats: Dict[str, Any] = self._reconcile(mid, compare="size")
+
+        parsed = 0
+        for page in self._iter_need(token):
+            rows = []
+            for uid, _pos, key, _size, _hash in page:
+                try:
+                    h, raw = read_maildir_message(root, key)
+                except OSError:
+                    continue
+                rows.append(_row(mid, uid, 0, h, _digest(raw)))
+            self._insert(rows)
+            parsed += len(rows)
+
+        self.db.execute("UPDATE mailboxes SET synced_at = ? WHERE id = ?", (time.time(), mid))
+        stats.update(messages=listed, parsed=parsed, unchanged=listed - stats["to_parse"], mode="maildir")
+        return stats
+
+    def _sync_mbox(self, mid: int, path: Path, token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        st = path.stat()
+        size, mtime, last_pos = self.db.execute(
+            "SELECT size, mtime, last_pos FROM mailboxes WHERE id = ?", (mid,)
+        ).fetchone()
+        if size == st.st_size and mtime == st.st_mtime:
+            return {"messages": self._count(mid), "parsed": 0, "removed": 0, "updated": 0, "mode": "unchanged"}
+
+        self._reset_seen()
+        parsed = 0
+        with open_mbox(path) as mm:
+            start_at = 0
+            mode = "full"
+            if 0 <= last_pos < size < st.st_size:
+                old = self.db.execute(
+                    "SELECT hash FROM messages WHERE mailbox_id = ? AND pos = ?", (mid, last_pos)
+                ).fetchone()
+                span = next(iter_mbox_spans(mm, last_pos), None)
+                if old is not None and span is not None and span[0] == last_pos:
+                    _line, raw = mbox_header_slice(mm, span[0], span[1])
+                    if _digest(raw) == old[0]:
+                        # Append-only growth: keep everything before the last
+                        # indexed message as-is and rescan from there.
+                        start_at, mode = last_pos, "append"
+                        self.db.execute(
+                            "INSERT INTO seen (uid, pos, key, size, hash, flags) "
+                            "SELECT uid, pos, key, size, hash, flags FROM messages WHERE mailbox_id = ? AND pos < ?",
+                            (mid, last_pos),
+                        )
+
+            def listing() -> Iterable[Tuple[Any, ...]]:
+                for start, end in iter_mbox_spans(mm, start_at):
+                    _line, raw = mbox_header_slice(mm, start, end)
+                    yield (str(start), start, str(start), end - start, _digest(raw), "")
+
+            self._fill_seen(listing(), token)
+            stats: Dict[str, Any] = self._reconcile(mid, compare="hash")
+
+            for page in self._iter_need(token):
+                rows = []
+                for uid, pos, _key, msize, digest in page:
+                    line, raw = mbox_header_slice(mm, pos, pos + msize)
+                    h = mbox_message(line, raw, start=pos, end=pos + msize, fallback_date=float(st.st_mtime))
+                    rows.append(_row(mid, uid, pos, h, digest))
+                self._insert(rows)
+                parsed += len(rows)
+
+        new_last = self.db.execute("SELECT MAX(pos) FROM messages WHERE mailbox_id = ?", (mid,)).fetchone()[0]
+        self.db.execute(
+            "UPDATE mailboxes SET size = ?, mtime = ?, last_pos = ?, synced_at = ? WHERE id = ?",
+            (st.st_size, st.st_mtime, -1 if new_last is None else new_last, time.time(), mid),
+        )
+        stats.update(messages=self._count(mid), parsed=parsed, mode=mode)
+        return stats
+
+    def _count(self, mid: int) -> int:
+        return int(self.db.execute("SELECT COUNT(*) FROM messages WHERE mailbox_id = ?", (mid,)).fetchone()[0])
+
+    def forget(self, mid: int, keys: Iterable[str]) -> None:
+        """Drop Maildir messages (by key) that were moved/deleted from the mailbox."""
+
+        # Delete by primary key; `key` is not indexed.
+        uids = ((mid, maildir_uid(k.rsplit("/", 1)[-1])) for k in keys)
+        with self.db:
+            self.db.executemany("DELETE FROM messages WHERE mailbox_id = ? AND uid = ?", uids)
+
+    # --- queries ---
+
+    def top_senders(
+        self,
+        mid: int,
+        n: int,
+        *,
+        older_than: float,
+        min_size: int,
+        bulk_only: bool,
+    ) -> List[Dict[str, Any]]:
+        rows = self.db.execute(
+            "SELECT sender, messages, bytes, bulk FROM sender_totals "
+            "WHERE mailbox_id = ? ORDER BY bytes DESC LIMIT ?",
+            (mid, n),
+        ).fetchall()
+        if not rows:
+            return []
+        # Per-sender reclaimable bytes for the top senders only, answered from
+        # the covering sender index.
+        marks = ", ".join("?" for _ in rows)
+        reclaimable = dict(
+            self.db.execute(
+                f"SELECT sender, SUM(size) FROM messages INDEXED BY messages_sender "
+                f"WHERE {_candidate_sql(bulk_only)} AND sender IN ({marks}) GROUP BY sender",
+                (mid, older_than, min_size, *[r[0] for r in rows]),
+            ).fetchall()
+        )
+        return [
+            {
+                "sender": sender or "(unknown)",
+                "messages": messages,
+                "bytes": nbytes,
+                "bulk_messages": bulk,
+                "reclaimable_bytes": int(reclaimable.get(sender) or 0),
+            }
+            for sender, messages, nbytes, bulk in rows
+        ]
+
+    def totals(self, mid: int) -> Dict[str, int]:
+        messages, nbytes, bulk, unsub = self.db.execute(
+            "SELECT COALESCE(SUM(messages), 0), COALESCE(SUM(bytes), 0), "
+            "COALESCE(SUM(bulk), 0), COALESCE(SUM(list_unsub), 0) FROM sender_totals WHERE mailbox_id = ?",
+            (mid,),
+        ).fetchone()
+        return {"messages": messages, "total_bytes": nbytes, "bulk_messages": bulk, "list_unsubscribe_messages": unsub}
+
+    def age_buckets(self, mid: int, now: float) -> Dict[str, int]:
+        d30, d365 = now - 30 * 86400, now - 365 * 86400
+        young, mid_age, old = self.db.execute(
+            "SELECT COALESCE(SUM(date > ?), 0), COALESCE(SUM(date <= ? AND date > ?), 0), COALESCE(SUM(date <= ?), 0) "
+            "FROM messages WHERE mailbox_id = ?",
+            (d30, d30, d365, d365, mid),
+        ).fetchone()
+        return {"<30d": young, "30-365d": mid_age, ">365d": old}
+
+    def candidates(
+        self,
+        mid: int,
+        *,
+        older_than: float,
+        min_size: int,
+        bulk_only: bool,
+    ) -> Tuple[int, int]:
+        count, nbytes = self.db.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM messages WHERE {_candidate_sql(bulk_only)}",
+            (mid, older_than, min_size),
+        ).fetchone()
+        return int(count), int(nbytes)
+
+    def candidate_rows(
+        self,
+        mid: int,
+        limit: int,
+        *,
+        older_than: float,
+        min_size: int,
+        bulk_only: bool,
+    ) -> List[Tuple[str, str, str, int, float]]:
+        """Oldest matching messages first: (key, sender, list_id, size, date)."""
+
+        return self.db.execute(
+            f"SELECT key, sender, list_id, size, date FROM messages WHERE {_candidate_sql(bulk_only)} "
+            "ORDER BY date LIMIT ?",
+            (mid, older_than, min_size, limit),
+        ).fetchall()
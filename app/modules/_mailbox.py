@@ -0,0 +1,288 @@
+"""Streaming, header-only readers for local Maildir and mbox mailboxes.
+
+Used by the Inbox Cleaner tool. Not a tool itself (underscore modules are
+skipped by discovery).
+
+Design goals:
+- Never parse MIME bodies: only the header block of each message is read.
+- Bounded memory: messages are yielded one at a time; mbox files are
+  memory-mapped so message boundaries are found without copying the body.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parseaddr, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+
+# Headers we care about (lower-cased). Everything else is skipped unparsed.
+WANTED_HEADERS = {
+    "from",
+    "date",
+    "list-id",
+    "list-unsubscribe",
+    "precedence",
+    "auto-submitted",
+}
+
+BULK_PRECEDENCE = {"bulk", "list", "junk"}
+
+# Cap on header bytes read per Maildir message; headers past this are ignored.
+MAX_HEADER_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class MessageHeader:
+    # Maildir: path relative to the mailbox root; mbox: byte offset as string.
+    key: str
+    sender: str
+    list_id: str
+    date: float
+    size_bytes: int
+    flags: str
+    list_unsubscribe: bool
+    bulk: bool
+
+
+def detect_format(path: Path) -> Optional[str]:
+    if path.is_dir() and ((path / "cur").is_dir() or (path / "new").is_dir()):
+        return "maildir"
+    if path.is_file():
+        return "mbox"
+    return None
+
+
+def parse_headers(raw: bytes) -> Dict[str, str]:
+    """Parse a raw header block into {lower-name: value} for WANTED_HEADERS.
+
+    Folded continuation lines are joined; the first occurrence of a header
+    wins (matches how MUAs show From/Date).
+    """
+
+    out: Dict[str, str] = {}
+    current: Optional[str] = None
+    for line in raw.split(b"\n"):
+        line = line.rstrip(b"\r")
+        if not line:
+            break
+        if line[:1] in (b" ", b"\t"):
+            if current is not None:
+                out[current] = (out[current] + " " + line.strip().decode("utf-8", "replace")).strip()
+            continue
+        name, sep, value = line.partition(b":")
+        if not sep:
+            current = None
+            continue
+        key = name.strip().lower().decode("ascii", "replace")
+        if key in WANTED_HEADERS and key not in out:
+            out[key] = value.strip().decode("utf-8", "replace")
+            current = key
+        else:
+            current = None
+    return out
+
+
+def _parse_date(value: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _normalize_sender(value: str) -> str:
+    _name, addr = parseaddr(value)
+    return (addr or value).strip().lower()
+
+
+def _is_bulk(h: Dict[str, str]) -> bool:
+    if h.get("list-id") or h.get("list-unsubscribe"):
+        return True
+    if h.get("precedence", "").strip().lower() in BULK_PRECEDENCE:
+        return True
+    auto = h.get("auto-submitted", "").strip().lower()
+    return bool(auto) and auto != "no"
+
+
+def make_header(key: str, h: Dict[str, str], *, size: int, fallback_date: float, flags: str = "") -> MessageHeader:
+    return MessageHeader(
+        key=key,
+        sender=_normalize_sender(h.get("from", "")),
+        list_id=h.get("list-id", "").strip().strip("<>").lower(),
+        date=_parse_date(h.get("date", "")) or fallback_date,
+        size_bytes=size,
+        flags=flags,
+        list_unsubscribe=bool(h.get("list-unsubscribe")),
+        bulk=_is_bulk(h),
+    )
+
+
+def _read_header_block(p: Path) -> bytes:
+    buf = b""
+    with p.open("rb") as f:
+        while len(buf) < MAX_HEADER_BYTES:
+            chunk = f.read(4096)
+            if not chunk:
+                break
+            buf += chunk
+            end = buf.find(b"\n\n")
+            if end == -1:
+                end = buf.find(b"\r\n\r\n")
+            if end != -1:
+                return buf[:end]
+    return buf
+
+
+def maildir_flags(name: str) -> str:
+    _base, sep, info = name.partition(":2,")
+    return info if sep else ""
+
+
+def maildir_uid(name: str) -> str:
+    """Maildir unique name: the filename without the `:2,FLAGS` info part."""
+
+    return name.partition(":2,")[0]
+
+
+def maildir_size_hint(name: str) -> Optional[int]:
+    """Size from the `,S=<bytes>` field many MDAs put in the unique name."""
+
+    for part in maildir_uid(name).split(",")[1:]:
+        if part.startswith("S="):
+            try:
+                return int(part[2:])
+            except ValueError:
+                return None
+    return None
+
+
+def iter_maildir_files(root: Path) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield (relative key, DirEntry) for every message in cur/ and new/."""
+
+    for sub in ("cur", "new"):
+        d = root / sub
+        if not d.is_dir():
+            continue
+        with os.scandir(d) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                yield f"{sub}/{entry.name}", entry
+
+
+def read_maildir_message(root: Path, key: str) -> Tuple[MessageHeader, bytes]:
+    """Parse one Maildir message's headers; also returns the raw header block."""
+
+    p = root / key
+    st = p.stat()
+    raw = _read_header_block(p)
+    h = make_header(
+        key,
+        parse_headers(raw),
+        size=int(st.st_size),
+        fallback_date=float(st.st_mtime),
+        flags=maildir_flags(p.name),
+    )
+    return h, raw
+
+
+def iter_maildir(root: Path) -> Iterator[MessageHeader]:
+    for key, _entry in iter_maildir_files(root):
+        try:
+            h, _raw = read_maildir_message(root, key)
+        except OSError:
+            continue
+        yield h
+
+
+def _mbox_from_line_date(line: bytes) -> Optional[float]:
+    # "From sender@example.com Sat Jan  3 01:05:34 1996"
+    parts = line.split(None, 2)
+    if len(parts) < 3:
+        return None
+    try:
+        return time.mktime(time.strptime(parts[2].decode("ascii", "replace").strip(), "%a %b %d %H:%M:%S %Y"))
+    except (ValueError, OverflowError):
+        return None
+
+
+def iter_mbox_spans(mm: mmap.mmap, start_at: int = 0) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) byte offsets of each message in a mapped mbox.
+
+    `start_at` must be 0 or the offset of a known message boundary.
+    """
+
+    size = len(mm)
+    if size == 0 or start_at >= size:
+        return
+    if mm[start_at : start_at + 5] == b"From ":
+        start = start_at
+    else:
+        start = mm.find(b"\nFrom ", start_at)
+        if start == -1:
+            return
+        start += 1
+    while start < size:
+        nxt = mm.find(b"\nFrom ", start)
+        end = size if nxt == -1 else nxt + 1
+        yield start, end
+        start = end
+
+
+def mbox_header_slice(mm: mmap.mmap, start: int, end: int) -> Tuple[bytes, bytes]:
+    """Return (From_ line, raw header block) for the message at [start, end).
+
+    Only these slices are copied out of the mapping; the body is never read.
+    """
+
+    line_end = mm.find(b"\n", start, end)
+    if line_end == -1:
+        line_end = end
+    hdr_end = mm.find(b"\n\n", line_end, end)
+    if hdr_end == -1:
+        hdr_end = min(end, line_end + MAX_HEADER_BYTES)
+    return mm[start:line_end], mm[line_end + 1 : hdr_end + 1]
+
+
+def mbox_message(from_line: bytes, raw: bytes, *, start: int, end: int, fallback_date: float) -> MessageHeader:
+    return make_header(
+        str(start),
+        parse_headers(raw),
+        size=end - start,
+        fallback_date=_mbox_from_line_date(from_line) or fallback_date,
+    )
+
+
+@contextmanager
+def open_mbox(path: Path) -> Iterator[mmap.mmap]:
+    """Memory-map an mbox read-only (empty files yield an empty bytes-like)."""
+
+    with path.open("rb") as f:
+        if path.stat().st_size == 0:
+            yield b""  # type: ignore[misc]
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield mm
+
+
+def iter_mbox(path: Path) -> Iterator[MessageHeader]:
+    mtime = float(path.stat().st_mtime)
+    with open_mbox(path) as mm:
+        for start, end in iter_mbox_spans(mm):
+            from_line, raw = mbox_header_slice(mm, start, end)
+            yield mbox_message(from_line, raw, start=start, end=end, fallback_date=mtime)
+
+
+def iter_mailbox(path: Path, fmt: str) -> Iterator[MessageHeader]:
+    if fmt == "maildir":
+        return iter_maildir(path)
+    return iter_mbox(path)
@@ -17,8 +17,9 @@ Design goals:
 
 from __future__ import annotations
 
+import ast
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Literal
+from typing import Any, Dict, Iterable, List, Literal, Optional
 
 
 AllowedIO = Literal["none", "read", "write"]
@@ -43,6 +44,9 @@ class ToolContract:
     # schema-ish (lightweight; avoids extra deps)
     input_schema: Dict[str, Any]
 
+    # optional: runs past this many seconds are cancelled cooperatively
+    max_runtime_s: Optional[float] = None
+
 
 @dataclass(frozen=True)
 class ValidationIssue:
@@ -117,6 +121,11 @@ def validate_tool_definition(td: Any) -> ValidationResult:
             if props is not None and not isinstance(props, dict):
                 issues.append(_issue("error", "input_schema.properties must be a dict when provided"))
 
+    if "max_runtime_s" in td:
+        limit = td.get("max_runtime_s")
+        if isinstance(limit, bool) or not isinstance(limit, (int, float)) or limit <= 0:
+            issues.append(_issue("error", "TOOL_DEFINITION.max_runtime_s must be a positive number"))
+
     # No mocks policy
     if td.get("mock") is True:
         issues.append(_issue("error", "mock tools are not allowed"))
@@ -138,6 +147,7 @@ def coerce_contract(td: Dict[str, Any]) -> ToolContract:
         allow_network=td["allow_network"],
         allow_filesystem=td["allow_filesystem"],
         input_schema=dict(td["input_schema"]),
+        max_runtime_s=float(td["max_runtime_s"]) if td.get("max_runtime_s") else None,
     )
 
 
@@ -147,3 +157,63 @@ def format_issues(issues: Iterable[ValidationIssue]) -> str:
         prefix = "ERROR" if i.level == "error" else "WARN"
         lines.append(f"{prefix}: {i.message}")
     return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class StaticModuleInfo:
+    """What can be learned about a tool module without importing it."""
+
+    tool_definition: Any
+    has_run: bool
+    issues: List[ValidationIssue]
+
+
+def read_module_static(source: str, filename: str = "<module>") -> StaticModuleInfo:
+    """Parse a module with `ast` and literal-evaluate its TOOL_DEFINITION.
+
+    No module code runs. A TOOL_DEFINITION that isn't a plain literal (e.g.
+    built by a function call) can't be read statically and is reported as an
+    error.
+    """
+
+    try:
+        tree = ast.parse(source, filename=filename)
+    except SyntaxError as e:
+        return StaticModuleInfo(None, False, [_issue("error", f"syntax error: {e.msg} (line {e.lineno})")])
+
+    td: Any = None
+    has_run = False
+    issues: List[ValidationIssue] = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "run":
+            has_run = True
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            if any((a.asname or a.name) == "run" for a in node.names):
+                has_run = True
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = {t.id for t in targets if isinstance(t, ast.Name)}
+            if "run" in names:
+                has_run = True
+            if "TOOL_DEFINITION" in names and node.value is not None:
+                try:
+                    td = ast.literal_eval(node.value)
+                except (ValueError, TypeError, SyntaxError, RecursionError):
+                    td = None
+                    issues.append(_issue("error", "TOOL_DEFINITION must be a literal dict to be read statically"))
+
+    return StaticModuleInfo(tool_definition=td, has_run=has_run, issues=issues)
+
+
+def validate_module_source(source: str, filename: str = "<module>") -> ValidationResult:
+    """Validate a tool module from its source alone (no import)."""
+
+    info = read_module_static(source, filename)
+    issues = list(info.issues)
+    if not issues:
+        issues.extend(validate_tool_definition(info.tool_definition).issues)
+    if not info.has_run:
+        issues.append(_issue("error", "missing callable run(payload: dict) -> Any"))
+
+    ok = not any(i.level == "error" for i in issues)
+    return ValidationResult(ok=ok, issues=issues)
@@ -4,23 +4,48 @@ A safe, real tool that scans a directory and reports:
 - largest files
 - oldest files
 
+Optional filters narrow the scan before anything is ranked:
+- `include` / `exclude` globs. A glob with a `/` matches the path relative to
+  `path`; any other glob matches the basename. A directory whose name or
+  relative path matches `exclude` is never descended into.
+- `min_size_bytes` / `max_size_bytes`
+- `older_than_days` / `newer_than_days` (by mtime)
+- `owners`: user names or uids
+
 Default is read-only. No deletion/mutation.
 
 Ralph Loop implementation here is conservative:
-- Observe: walk directory and collect file stats
+- Observe: walk directory and collect file stats into compact columns
+  (see `_fs_columns`)
 - Execute: compute rankings
 - Verify: validate output invariants (sorted, paths exist)
 - Self-correct: if invariants fail, retry with safer settings (e.g. smaller
   limits) up to 3 tries
+
+The walk checks the request's cancellation token once per directory and the
+loop checks it between phases; a cancelled scan returns `status: cancelled`.
 """
 
 from __future__ import annotations
 
+import fnmatch
 import os
+import re
+import stat
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Pattern, Sequence, Tuple
+
+from app.cancellation import Cancelled, CancelToken, current_token
+from app.tracing import span
+
+from ._fs_columns import FileColumns
+
+try:  # Unix only
+    import pwd
+except ImportError:  # pragma: no cover - depends on platform
+    pwd = None  # type: ignore[assignment]
 
 
 TOOL_DEFINITION = {
@@ -32,25 +57,29 @@ TOOL_DEFINITION = {
     "ralph_loop": True,
     "allow_network": "none",
     "allow_filesystem": "read",
+    "max_runtime_s": 300,
     "input_schema": {
         "type": "object",
         "properties": {
             "path": {"type": "string", "default": "."},
             "top_n": {"type": "integer", "default": 20, "minimum": 1, "maximum": 200},
-            "max_files": {"type": "integer", "default": 20000, "minimum": 1, "maximum": 200000},
+            "max_files": {"type": "integer", "default": 20000, "minimum": 1, "maximum": 1000000},
             "follow_symlinks": {"type": "boolean", "default": False},
+            "include": {"type": "array", "items": {"type": "string"}},
+            "exclude": {"type": "array", "items": {"type": "string"}},
+            "min_size_bytes": {"type": "integer", "minimum": 0},
+            "max_size_bytes": {"type": "integer", "minimum": 0},
+            "older_than_days": {"type": "number", "minimum": 0},
+            "newer_than_days": {"type": "number", "minimum": 0},
+            "owners": {"type": "array", "items": {"type": ["string", "integer"]}},
         },
         "required": ["path"],
         "additionalProperties": False,
     },
 }
 
-
-@dataclass(frozen=True)
-class FileStat:
-    path: str
-    size_bytes: int
-    mtime: float
+# Matches the input_schema maximum; columns cost ~40 bytes per file.
+MAX_FILES_LIMIT = 1_000_000
 
 
 def _safe_int(v: Any, default: int) -> int:
@@ -60,65 +89,233 @@ def _safe_int(v: Any, default: int) -> int:
         return default
 
 
+class _Globs:
+    """Glob patterns. Ones containing `/` match the path relative to the scan
+    root; the rest match the basename."""
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        self.patterns = tuple(patterns)
+        cleaned = [p.strip("/") for p in self.patterns]
+        self._name = _compile_globs([p for p in cleaned if "/" not in p])
+        self._path = _compile_globs([p for p in cleaned if "/" in p])
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def match(self, name: str, rel: str) -> bool:
+        if self._name is not None and self._name.match(name):
+            return True
+        return self._path is not None and self._path.match(rel) is not None
+
+
+def _compile_globs(patterns: Sequence[str]) -> Optional[Pattern[str]]:
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns))
+
+
+@dataclass(frozen=True)
+class FileFilter:
+    include: _Globs
+    exclude: _Globs
+    min_size_bytes: int = 0
+    max_size_bytes: Optional[int] = None
+    min_mtime_ns: Optional[int] = None
+    max_mtime_ns: Optional[int] = None
+    uids: Optional[FrozenSet[int]] = None
+
+    def prunes_dir(self, name: str, rel: str) -> bool:
+        return bool(self.exclude) and self.exclude.match(name, rel)
+
+    def matches_name(self, name: str, rel: str) -> bool:
+        if self.include and not self.include.match(name, rel):
+            return False
+        return not (self.exclude and self.exclude.match(name, rel))
+
+    def matches_stat(self, st: os.stat_result) -> bool:
+        if st.st_size < self.min_size_bytes:
+            return False
+        if self.max_size_bytes is not None and st.st_size > self.max_size_bytes:
+            return False
+        if self.min_mtime_ns is not None and st.st_mtime_ns < self.min_mtime_ns:
+            return False
+        if self.max_mtime_ns is not None and st.st_mtime_ns > self.max_mtime_ns:
+            return False
+        return self.uids is None or st.st_uid in self.uids
+
+
+def _parse_filter(payload: dict, now: float) -> Optional[FileFilter]:
+    """Build a FileFilter from the payload; None when no filter is set.
+
+    Raises ValueError on malformed filters.
+    """
+
+    def globs(key: str) -> _Globs:
+        raw = payload.get(key) or []
+        if isinstance(raw, str):
+            raw = [raw]
+        if not isinstance(raw, list) or not all(isinstance(p, str) and p.strip("/") for p in raw):
+            raise ValueError(f"{key} must be a list of non-empty glob strings")
+        return _Globs(raw)
+
+    def number(key: str) -> Optional[float]:
+        raw = payload.get(key)
+        if raw is None:
+            return None
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} must be a number") from None
+        if value < 0:
+            raise ValueError(f"{key} must be >= 0")
+        return value
+
+    include, exclude = globs("include"), globs("exclude")
+    min_size, max_size = number("min_size_bytes"), number("max_size_bytes")
+    older, newer = number("older_than_days"), number("newer_than_days")
+    if min_size is not None and max_size is not None and min_size > max_size:
+        raise ValueError("min_size_bytes is larger than max_size_bytes")
+    if older is not None and newer is not None and older > newer:
+        raise ValueError("older_than_days is larger than newer_than_days")
+
+    uids = _resolve_owners(payload.get("owners"))
+    if not (include or exclude or uids is not None) and all(
+        v is None for v in (min_size, max_size, older, newer)
+    ):
+        return None
+
+    def cutoff_ns(days: Optional[float]) -> Optional[int]:
+        return None if days is None else int((now - days * 86400) * 1e9)
+
+    return FileFilter(
+        include=include,
+        exclude=exclude,
+        min_size_bytes=int(min_size or 0),
+        max_size_bytes=None if max_size is None else int(max_size),
+        min_mtime_ns=cutoff_ns(newer),
+        max_mtime_ns=cutoff_ns(older),
+        uids=uids,
+    )
+
+
+def _resolve_owners(raw: Any) -> Optional[FrozenSet[int]]:
+    if raw is None:
+        return None
+    if isinstance(raw, (str, int)):
+        raw = [raw]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("owners must be a non-empty list of user names or uids")
+    uids = set()
+    for owner in raw:
+        if isinstance(owner, int) and not isinstance(owner, bool):
+            uids.add(owner)
+        elif isinstance(owner, str) and owner.isdigit():
+            uids.add(int(owner))
+        elif isinstance(owner, str) and pwd is not None:
+            try:
+                uids.add(pwd.getpwnam(owner).pw_uid)
+            except KeyError:
+                raise ValueError(f"unknown owner: {owner}") from None
+        else:
+            raise ValueError(f"cannot resolve owner: {owner!r}")
+    return frozenset(uids)
+
+
 def _walk_files(
     root: Path,
     *,
     max_files: int,
     follow_symlinks: bool,
-) -> Tuple[List[FileStat], List[str]]:
-    stats: List[FileStat] = []
+    token: Optional[CancelToken] = None,
+    file_filter: Optional[FileFilter] = None,
+) -> Tuple[FileColumns, List[str], Dict[str, int]]:
+    cols = FileColumns()
     skipped: List[str] = []
+    counts = {"filtered_out": 0, "pruned_dirs": 0}
+    ff = file_filter
+
+    # Iterative scandir walk: entries carry their type, so only files need a
+    # stat call. Symlinked files are followed; symlinked dirs only if asked.
+    # Name filters run before the stat, excluded dirs are never listed.
+    stack = [(str(root), "")]
+    while stack:
+        dirpath, rel = stack.pop()
+        if token is not None:
+            token.check()
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        dir_id = -1
+        subdirs: List[Tuple[str, str]] = []
+        for entry in entries:
+            name = entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if follow_symlinks or not entry.is_symlink():
+                    sub_rel = f"{rel}/{name}" if rel else name
+                    if ff is not None and ff.prunes_dir(name, sub_rel):
+                        counts["pruned_dirs"] += 1
+                    else:
+                        subdirs.append((entry.path, sub_rel))
+                continue
 
-    # os.walk is faster and gives control over followlinks
-    count = 0
-    for dirpath, dirnames, filenames in os.walk(root, followlinks=follow_symlinks):
-        _ = dirnames
-        for name in filenames:
-            if count >= max_files:
+            if ff is not None and not ff.matches_name(name, f"{rel}/{name}" if rel else name):
+                counts["filtered_out"] += 1
+                continue
+
+            if len(cols) >= max_files:
                 skipped.append(f"Hit max_files={max_files}; remaining files not scanned")
-                return stats, skipped
+                return cols, skipped, counts
 
-            p = Path(dirpath) / name
             try:
-                st = p.stat()
+                st = entry.stat()
             except Exception as e:  # noqa: BLE001
-                skipped.append(f"stat failed: {p}: {e}")
+                skipped.append(f"stat failed: {entry.path}: {e}")
                 continue
 
-            if not p.is_file():
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            if ff is not None and not ff.matches_stat(st):
+                counts["filtered_out"] += 1
                 continue
 
-            stats.append(FileStat(path=str(p), size_bytes=int(st.st_size), mtime=float(st.st_mtime)))
-            count += 1
+            if dir_id < 0:
+                dir_id = cols.dir_id(dirpath)
+            cols.append(dir_id, name, st.st_size, st.st_mtime_ns)
 
-    return stats, skipped
+        stack.extend(reversed(subdirs))
 
+    return cols, skipped, counts
 
-def _rank_largest(stats: Iterable[FileStat], top_n: int) -> List[Dict[str, Any]]:
-    ranked = sorted(stats, key=lambda s: s.size_bytes, reverse=True)[:top_n]
-    return [
-        {
-            "path": s.path,
-            "size_bytes": s.size_bytes,
-            "size_mb": round(s.size_bytes / (1024 * 1024), 2),
-            "mtime": s.mtime,
-        }
-        for s in ranked
-    ]
 
+def _entry(cols: FileColumns, i: int) -> Dict[str, Any]:
+    size = cols.sizes[i]
+    return {
+        "path": cols.path(i),
+        "size_bytes": size,
+        "size_mb": round(size / (1024 * 1024), 2),
+        "mtime": cols.mtimes_ns[i] / 1e9,
+    }
+
+
+def _rank_largest(cols: FileColumns, top_n: int) -> List[Dict[str, Any]]:
+    return [_entry(cols, i) for i in cols.top_indices(cols.sizes, top_n, largest=True)]
 
-def _rank_oldest(stats: Iterable[FileStat], top_n: int) -> List[Dict[str, Any]]:
-    ranked = sorted(stats, key=lambda s: s.mtime)[:top_n]
-    return [
-        {
-            "path": s.path,
-            "size_bytes": s.size_bytes,
-            "size_mb": round(s.size_bytes / (1024 * 1024), 2),
-            "mtime": s.mtime,
-            "age_days": round((time.time() - s.mtime) / 86400, 2),
-        }
-        for s in ranked
-    ]
+
+def _rank_oldest(cols: FileColumns, top_n: int) -> List[Dict[str, Any]]:
+    now = time.time()
+    ranked = []
+    for i in cols.top_indices(cols.mtimes_ns, top_n, largest=False):
+        item = _entry(cols, i)
+        item["age_days"] = round((now - item["mtime"]) / 86400, 2)
+        ranked.append(item)
+    return ranked
 
 
 def _verify_rankings(largest: List[Dict[str, Any]], oldest: List[Dict[str, Any]]) -> Tuple[bool, str]:
@@ -151,11 +348,17 @@ def run(payload: dict):
     top_n = max(1, min(200, top_n))
 
     max_files = _safe_int(payload.get("max_files"), 20000)
-    max_files = max(1, min(200000, max_files))
+    max_files = max(1, min(MAX_FILES_LIMIT, max_files))
 
     follow_symlinks = bool(payload.get("follow_symlinks", False))
 
+    try:
+        file_filter = _parse_filter(payload, time.time())
+    except ValueError as exc:
+        return {"status": "error", "error": "invalid_filter", "detail": str(exc)}
+
     trace: List[Dict[str, Any]] = []
+    token = current_token()
 
     attempt_settings = [
         {"top_n": top_n, "max_files": max_files, "follow_symlinks": follow_symlinks},
@@ -166,23 +369,36 @@ def run(payload: dict):
     last_reason: Optional[str] = None
     for attempt, settings in enumerate(attempt_settings, start=1):
         trace.append({"step": "observe", "note": f"walk {root} (attempt {attempt})"})
-        stats, skipped = _walk_files(
-            root,
-            max_files=int(settings["max_files"]),
-            follow_symlinks=bool(settings["follow_symlinks"]),
-        )
-
-        trace.append({"step": "execute", "note": f"rank {len(stats)} files"})
-        largest = _rank_largest(stats, int(settings["top_n"]))
-        oldest = _rank_oldest(stats, int(settings["top_n"]))
+        try:
+            with span("ralph.observe", tool="fs", attempt=attempt):
+                cols, skipped, counts = _walk_files(
+                    root,
+                    max_files=int(settings["max_files"]),
+                    follow_symlinks=bool(settings["follow_symlinks"]),
+                    token=token,
+                    file_filter=file_filter,
+                )
+            token.check()
+        except Cancelled as exc:
+            trace.append({"step": "observe", "note": f"cancelled: {exc.reason}"})
+            return {"status": "cancelled", "reason": exc.reason, "root": str(root), "trace": trace}
+
+        trace.append({"step": "execute", "note": f"rank {len(cols)} files"})
+        with span("ralph.execute", tool="fs", attempt=attempt, files=len(cols)):
+            largest = _rank_largest(cols, int(settings["top_n"]))
+            oldest = _rank_oldest(cols, int(settings["top_n"]))
+            total_bytes = cols.total_bytes()
 
         trace.append({"step": "verify", "note": "check ranking invariants"})
-        ok, reason = _verify_rankings(largest, oldest)
+        with span("ralph.verify", tool="fs", attempt=attempt):
+            ok, reason = _verify_rankings(largest, oldest)
         if ok:
             return {
                 "status": "success",
                 "root": str(root),
-                "scanned_files": len(stats),
+                "scanned_files": len(cols),
+                "total_bytes": total_bytes,
+                **counts,
                 "skipped": skipped,
                 "largest": largest,
                 "oldest": oldest,
@@ -1,18 +1,78 @@
+"""Inbox Cleaner tool.
+
+Streams a local Maildir or mbox mailbox (header-only, bounded memory) and
+reports what could be cleaned up:
+- bulk/list mail (List-Id, List-Unsubscribe, Precedence, Auto-Submitted)
+- biggest senders by bytes
+- reclaimable bytes for messages matching the age/size/bulk criteria
+
+Default is `dry_run=True` (report only). With `dry_run=False` matching Maildir
+messages are moved to `move_to` (another Maildir) or deleted; mbox files are
+never rewritten.
+
+By default headers are kept in a persistent SQLite index (`KIT_INBOX_INDEX`,
+or `index_path`) so later runs only parse new or changed messages and the
+report is answered from the index; `use_index=False` streams every header.
+
+Ralph Loop:
+- Observe: sync the index (or stream headers) and classify messages
+- Execute: apply the action in per-folder batches on a bounded worker pool
+  (skipped on dry_run)
+- Verify: summary invariants; for actions, each affected folder is listed once
+  per round to confirm sources are gone and moved messages arrived
+- Self-correct: retry only the failed messages, up to 3 attempts
+
+On cancellation (client gone, deadline) the scan stops early. An action stops
+at the next batch boundary, verifies what was done and returns
+`status: cancelled`.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.cancellation import Cancelled, CancelToken, current_token
+from app.tracing import span
+
+from ._inbox_index import HeaderIndex, is_busy
+from ._mailbox import MessageHeader, detect_format, iter_mailbox
+
+
 TOOL_DEFINITION = {
     "id": "inbox",
     "name": "Inbox Cleaner",
     "icon": "envelope",
-    "description": "Inbox cleanup powered by the Ralph Loop (not implemented yet).",
+    "description": "Stream a local Maildir/mbox, report bulk senders and reclaimable bytes; optionally move/delete (Maildir).",
 
     # Contract / governance
-    "version": "0.1.0",
+    "version": "0.2.0",
     "ralph_loop": True,
     "allow_network": "none",
-    "allow_filesystem": "none",
+    "allow_filesystem": "write",
+    "max_runtime_s": 600,
     "input_schema": {
         "type": "object",
         "properties": {
+            "path": {"type": "string", "default": "~/Maildir"},
+            "format": {"type": "string", "enum": ["auto", "maildir", "mbox"], "default": "auto"},
             "dry_run": {"type": "boolean", "default": True},
+            "older_than_days": {"type": "integer", "default": 365, "minimum": 0},
+            "min_size_bytes": {"type": "integer", "default": 0, "minimum": 0},
+            "bulk_only": {"type": "boolean", "default": True},
+            "top_n": {"type": "integer", "default": 20, "minimum": 1, "maximum": 200},
+            "action": {"type": "string", "enum": ["move", "delete"], "default": "move"},
+            "move_to": {"type": "string"},
+            "max_actions": {"type": "integer", "default": 1000, "minimum": 1, "maximum": 100000},
+            "batch_size": {"type": "integer", "default": 500, "minimum": 1, "maximum": 10000},
+            "workers": {"type": "integer", "default": 8, "minimum": 1, "maximum": 32},
+            "use_index": {"type": "boolean", "default": True},
+            "index_path": {"type": "string"},
         },
         "required": [],
         "additionalProperties": False,
@@ -20,16 +80,485 @@ TOOL_DEFINITION = {
 }
 
 
-# Implementation of the Ralph Loop for Email
-def clean_inbox():
+# Upper bound on distinct senders tracked; beyond it the smallest senders are
+# pruned, so top-sender numbers become approximate but memory stays bounded.
+MAX_SENDERS = 50000
+SAMPLE_SIZE = 20
+MAX_ATTEMPTS = 3
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_WORKERS = 8
+# Streaming scans check for cancellation every this many messages.
+CANCEL_CHECK_EVERY = 1024
+
+
+def _safe_int(v: Any, default: int) -> int:
+    try:
+        return int(v)
+    except Exception:  # noqa: BLE001
+        return default
+
+
+@dataclass(frozen=True)
+class Criteria:
+    older_than_days: int
+    min_size_bytes: int
+    bulk_only: bool
+
+    def matches(self, h: MessageHeader, now: float) -> bool:
+        if self.bulk_only and not h.bulk:
+            return False
+        if h.size_bytes < self.min_size_bytes:
+            return False
+        return (now - h.date) >= self.older_than_days * 86400
+
+
+class _SenderTable:
+    def __init__(self, cap: int = MAX_SENDERS) -> None:
+        self.cap = cap
+        # sender -> [messages, bytes, bulk_messages, reclaimable_bytes]
+        self.rows: Dict[str, List[int]] = {}
+        self.approximate = False
+
+    def add(self, h: MessageHeader, candidate: bool) -> None:
+        row = self.rows.get(h.sender)
+        if row is None:
+            if len(self.rows) >= self.cap:
+                self._prune()
+            row = self.rows[h.sender] = [0, 0, 0, 0]
+        row[0] += 1
+        row[1] += h.size_bytes
+        row[2] += int(h.bulk)
+        if candidate:
+            row[3] += h.size_bytes
+
+    def _prune(self) -> None:
+        keep = sorted(self.rows.items(), key=lambda kv: kv[1][1], reverse=True)[: self.cap // 2]
+        self.rows = dict(keep)
+        self.approximate = True
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        ranked = sorted(self.rows.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        return [
+            {
+                "sender": sender or "(unknown)",
+                "messages": r[0],
+                "bytes": r[1],
+                "bulk_messages": r[2],
+                "reclaimable_bytes": r[3],
+            }
+            for sender, r in ranked
+        ]
+
+
+def _age_bucket(age_days: float) -> str:
+    if age_days < 30:
+        return "<30d"
+    if age_days < 365:
+        return "30-365d"
+    return ">365d"
+
+
+def _observe(
+    root: Path,
+    fmt: str,
+    criteria: Criteria,
+    *,
+    top_n: int,
+    collect_keys: int,
+    token: Optional[CancelToken] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    now = time.time()
+    senders = _SenderTable()
+    summary: Dict[str, Any] = {
+        "messages": 0,
+        "total_bytes": 0,
+        "bulk_messages": 0,
+        "list_unsubscribe_messages": 0,
+        "candidates": 0,
+        "reclaimable_bytes": 0,
+        "age_buckets": {"<30d": 0, "30-365d": 0, ">365d": 0},
+    }
+    sample: List[Dict[str, Any]] = []
+    keys: List[str] = []
+
+    for n, h in enumerate(iter_mailbox(root, fmt)):
+        if token is not None and n % CANCEL_CHECK_EVERY == 0:
+            token.check()
+        candidate = criteria.matches(h, now)
+        age_days = (now - h.date) / 86400
+
+        summary["messages"] += 1
+        summary["total_bytes"] += h.size_bytes
+        summary["bulk_messages"] += int(h.bulk)
+        summary["list_unsubscribe_messages"] += int(h.list_unsubscribe)
+        summary["age_buckets"][_age_bucket(age_days)] += 1
+        senders.add(h, candidate)
+
+        if not candidate:
+            continue
+        summary["candidates"] += 1
+        summary["reclaimable_bytes"] += h.size_bytes
+        if len(sample) < SAMPLE_SIZE:
+            sample.append(
+                {
+                    "key": h.key,
+                    "sender": h.sender,
+                    "list_id": h.list_id,
+                    "size_bytes": h.size_bytes,
+                    "age_days": round(age_days, 1),
+                }
+            )
+        if len(keys) < collect_keys:
+            keys.append(h.key)
+
+    summary["reclaimable_mb"] = round(summary["reclaimable_bytes"] / (1024 * 1024), 2)
+    summary["top_senders"] = senders.top(top_n)
+    summary["top_senders_approximate"] = senders.approximate
+    summary["sample_candidates"] = sample
+    return summary, keys
+
+
+def _observe_indexed(
+    index: HeaderIndex,
+    root: Path,
+    fmt: str,
+    criteria: Criteria,
+    *,
+    top_n: int,
+    collect_keys: int,
+    token: Optional[CancelToken] = None,
+) -> Tuple[Dict[str, Any], List[str], Dict[str, Any]]:
+    sync = index.sync(root, fmt, token)
+    mid = int(sync["mailbox_id"])
+
+    t0 = time.perf_counter()
+    now = time.time()
+    q = {
+        "older_than": now - criteria.older_than_days * 86400,
+        "min_size": criteria.min_size_bytes,
+        "bulk_only": criteria.bulk_only,
+    }
+    summary: Dict[str, Any] = dict(index.totals(mid))
+    summary["candidates"], summary["reclaimable_bytes"] = index.candidates(mid, **q)
+    summary["age_buckets"] = index.age_buckets(mid, now)
+    summary["reclaimable_mb"] = round(summary["reclaimable_bytes"] / (1024 * 1024), 2)
+    summary["top_senders"] = index.top_senders(mid, top_n, **q)
+    summary["top_senders_approximate"] = False
+
+    rows = index.candidate_rows(mid, max(SAMPLE_SIZE, collect_keys), **q)
+    summary["sample_candidates"] = [
+        {
+            "key": key,
+            "sender": sender,
+            "list_id": list_id,
+            "size_bytes": size,
+            "age_days": round((now - date) / 86400, 1),
+        }
+        for key, sender, list_id, size, date in rows[:SAMPLE_SIZE]
+    ]
+    keys = [r[0] for r in rows[:collect_keys]]
+
+    sync["query_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    sync["path"] = str(index.path)
+    return summary, keys, sync
+
+
+def _verify_summary(s: Dict[str, Any]) -> Tuple[bool, str]:
+    if s["candidates"] > s["messages"]:
+        return False, "more candidates than messages"
+    if s["reclaimable_bytes"] > s["total_bytes"]:
+        return False, "reclaimable bytes exceed total bytes"
+    if sum(s["age_buckets"].values()) != s["messages"]:
+        return False, "age buckets do not add up"
+    sizes = [x["bytes"] for x in s["top_senders"]]
+    if sizes != sorted(sizes, reverse=True):
+        return False, "top senders not sorted by bytes"
+    return True, "ok"
+
+
+def _ensure_maildir(dest: Path) -> None:
+    for sub in ("cur", "new", "tmp"):
+        (dest / sub).mkdir(parents=True, exist_ok=True)
+
+
+def _apply_one(root: Path, key: str, action: str, dest: Optional[Path]) -> Optional[str]:
+    src = root / key
+    try:
+        if action == "delete":
+            src.unlink()
+            return None
+        # Keep the cur/new placement and the filename (which carries the flags).
+        target = dest / key  # type: ignore[operator]
+        if target.exists():
+            return f"destination exists: {target}"
+        os.rename(src, target)
+        return None
+    except FileNotFoundError:
+        # Already gone (e.g. a previous attempt succeeded); verify decides.
+        return None
+    except Exception as e:  # noqa: BLE001
+        return str(e)
+
+
+def _plan_batches(keys: List[str], batch_size: int) -> List[List[str]]:
+    """Group keys by folder (cur/new, hence by destination folder) and chunk."""
+
+    groups: Dict[str, List[str]] = {}
+    for key in keys:
+        groups.setdefault(key.split("/", 1)[0], []).append(key)
+    return [g[i : i + batch_size] for g in groups.values() for i in range(0, len(g), batch_size)]
+
+
+def _apply_batch(
+    root: Path, batch: List[str], action: str, dest: Optional[Path], token: Optional[CancelToken] = None
+) -> Tuple[Dict[str, str], float]:
+    t0 = time.perf_counter()
+    errors: Dict[str, str] = {}
+    if token is not None and token.cancelled:
+        # Stop at a batch boundary; verify still reports what was done.
+        return {key: f"skipped: {token.reason}" for key in batch}, 0.0
+    for key in batch:
+        err = _apply_one(root, key, action, dest)
+        if err:
+            errors[key] = err
+    return errors, time.perf_counter() - t0
+
+
+def _listing(d: Path) -> set:
+    try:
+        return set(os.listdir(d))
+    except FileNotFoundError:
+        return set()
+
+
+def _verify_batches(
+    root: Path,
+    batches: List[List[str]],
+    action: str,
+    dest: Optional[Path],
+) -> List[List[str]]:
+    """Return the unconfirmed keys of each batch.
+
+    Each affected folder (source and destination) is listed once for the
+    whole round instead of stat'ing every message.
+    """
+
+    folders = {b[0].split("/", 1)[0] for b in batches if b}
+    src = {f: _listing(root / f) for f in folders}
+    dst = {f: _listing(dest / f) for f in folders} if action == "move" and dest is not None else {}
+
+    out: List[List[str]] = []
+    for batch in batches:
+        failed = []
+        for key in batch:
+            folder, name = key.split("/", 1)
+            if name in src[folder] or (action == "move" and name not in dst.get(folder, ())):
+                failed.append(key)
+        out.append(failed)
+    return out
+
+
+def clean_inbox(
+    root: Path,
+    fmt: str,
+    criteria: Criteria,
+    *,
+    dry_run: bool = True,
+    action: str = "move",
+    dest: Optional[Path] = None,
+    top_n: int = 20,
+    max_actions: int = 1000,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    index: Optional[HeaderIndex] = None,
+) -> Dict[str, Any]:
+    """Run the Ralph Loop over one mailbox."""
+
+    trace: List[Dict[str, Any]] = []
+    collect_keys = 0 if dry_run else max_actions
+    token = current_token()
+
     # 1. Observe
-    # 2. Execute
-    # 3. Verify
-    # 4. Self-Correct
-    pass
+    index_stats: Optional[Dict[str, Any]] = None
+    try:
+        with span("ralph.observe", tool="inbox", format=fmt, indexed=index is not None):
+            if index is not None:
+                trace.append({"step": "observe", "note": f"sync {fmt} index for {root}"})
+                summary, keys, index_stats = _observe_indexed(
+                    index, root, fmt, criteria, top_n=top_n, collect_keys=collect_keys, token=token
+                )
+            else:
+                trace.append({"step": "observe", "note": f"stream {fmt} headers from {root}"})
+                summary, keys = _observe(root, fmt, criteria, top_n=top_n, collect_keys=collect_keys, token=token)
+        token.check()
+    except Cancelled as exc:
+        trace.append({"step": "observe", "note": f"cancelled: {exc.reason}"})
+        return {"status": "cancelled", "reason": exc.reason, "root": str(root), "format": fmt, "trace": trace}
+
+    base = {"root": str(root), "format": fmt, "dry_run": dry_run, **summary}
+    if index_stats is not None:
+        base["index"] = index_stats
+
+    if dry_run:
+        trace.append({"step": "execute", "note": "dry_run: report only, no changes"})
+        trace.append({"step": "verify", "note": "check summary invariants"})
+        with span("ralph.verify", tool="inbox"):
+            ok, reason = _verify_summary(summary)
+        if not ok:
+            return {"status": "failed", "detail": reason, "trace": trace, **base}
+        return {"status": "success", "trace": trace, **base}
+
+    if dest is not None:
+        _ensure_maildir(dest)
+
+    pending = list(keys)
+    errors: Dict[str, str] = {}
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inbox-apply") as pool:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            batches = _plan_batches(pending, batch_size)
+
+            # 2. Execute: batches run in parallel on a bounded pool.
+            t0 = time.perf_counter()
+            with span("ralph.execute", tool="inbox", attempt=attempt, messages=len(pending), batches=len(batches)):
+                results = list(pool.map(lambda b: _apply_batch(root, b, action, dest, token), batches))
+            elapsed = time.perf_counter() - t0
+            for errs, _secs in results:
+                errors.update(errs)
+            trace.append(
+                {
+                    "step": "execute",
+                    "note": f"{action} {len(pending)} messages in {len(batches)} batches (attempt {attempt})",
+                    "workers": workers,
+                    "seconds": round(elapsed, 3),
+                    "messages_per_s": round(len(pending) / elapsed, 1) if elapsed > 0 else None,
+                }
+            )
+
+            # 3. Verify: one listing per affected folder for the whole round.
+            with span("ralph.verify", tool="inbox", attempt=attempt):
+                unconfirmed = _verify_batches(root, batches, action, dest)
+            failed = [k for batch_failed in unconfirmed for k in batch_failed]
+            trace.append(
+                {
+                    "step": "verify",
+                    "note": f"confirmed {len(pending) - len(failed)}/{len(pending)} messages",
+                    "batches": [
+                        {
+                            "batch": i,
+                            "folder": b[0].split("/", 1)[0],
+                            "messages": len(b),
+                            "confirmed": len(b) - len(f),
+                            "failed": len(f),
+                            "seconds": round(results[i][1], 3),
+                        }
+                        for i, (b, f) in enumerate(zip(batches, unconfirmed))
+                    ],
+                }
+            )
+            done += len(pending) - len(failed)
+            pending = failed
+            if not failed or token.cancelled:
+                break
+
+            # 4. Self-correct: only the failed subset goes round again.
+            if attempt < MAX_ATTEMPTS:
+                trace.append({"step": "self_correct", "note": f"{len(failed)} messages not confirmed; retrying"})
+
+    failed_errors = {k: errors.get(k, "not confirmed") for k in pending}
+    if index is not None and index_stats is not None:
+        try:
+            index.forget(int(index_stats["mailbox_id"]), (k for k in keys if k not in failed_errors))
+        except sqlite3.OperationalError as exc:
+            if not is_busy(exc):
+                raise
+            # The actions are done; the next sync drops the stale rows.
+            trace.append({"step": "verify", "note": "index busy; stale rows left for the next sync"})
+    actions = {
+        "action": action,
+        "move_to": str(dest) if dest is not None else None,
+        "requested": len(keys),
+        "truncated": summary["candidates"] > len(keys),
+        "applied": done,
+        "failed": len(failed_errors),
+        "failures": [{"key": k, "error": e} for k, e in list(failed_errors.items())[:SAMPLE_SIZE]],
+    }
+    if failed_errors and token.cancelled:
+        return {"status": "cancelled", "reason": token.reason, "actions": actions, "trace": trace, **base}
+    status = "success" if not failed_errors else "failed"
+    return {"status": status, "actions": actions, "trace": trace, **base}
 
 
 def run(payload: dict):
-    # Placeholder runner used by /modules/run/inbox
-    _ = payload
-    return {"status": "noop", "message": "Inbox cleaner not implemented yet."}
+    root = Path(str(payload.get("path") or "~/Maildir")).expanduser().resolve()
+
+    fmt = str(payload.get("format") or "auto")
+    detected = detect_format(root)
+    if fmt == "auto":
+        fmt = detected or ""
+    if not fmt or (fmt == "maildir" and detected != "maildir") or (fmt == "mbox" and not root.is_file()):
+        return {
+            "status": "error",
+            "error": "mailbox_not_found",
+            "detail": f"Not a Maildir or mbox file: {root}",
+        }
+
+    dry_run = bool(payload.get("dry_run", True))
+    action = str(payload.get("action") or "move")
+    if action not in {"move", "delete"}:
+        return {"status": "error", "error": "invalid_action", "detail": f"Unknown action: {action}"}
+
+    dest: Optional[Path] = None
+    if not dry_run:
+        if fmt != "maildir":
+            return {
+                "status": "error",
+                "error": "mbox_read_only",
+                "detail": "Changes are only supported for Maildir; mbox is report-only.",
+            }
+        if action == "move":
+            if not payload.get("move_to"):
+                return {"status": "error", "error": "move_to_required", "detail": "action=move needs move_to"}
+            dest = Path(str(payload["move_to"])).expanduser().resolve()
+            if dest == root:
+                return {"status": "error", "error": "move_to_is_source", "detail": "move_to must differ from path"}
+
+    criteria = Criteria(
+        older_than_days=max(0, _safe_int(payload.get("older_than_days"), 365)),
+        min_size_bytes=max(0, _safe_int(payload.get("min_size_bytes"), 0)),
+        bulk_only=bool(payload.get("bulk_only", True)),
+    )
+    top_n = max(1, min(200, _safe_int(payload.get("top_n"), 20)))
+    max_actions = max(1, min(100000, _safe_int(payload.get("max_actions"), 1000)))
+    batch_size = max(1, min(10000, _safe_int(payload.get("batch_size"), DEFAULT_BATCH_SIZE)))
+    workers = max(1, min(32, _safe_int(payload.get("workers"), DEFAULT_WORKERS)))
+
+    index: Optional[HeaderIndex] = None
+    try:
+        if bool(payload.get("use_index", True)):
+            index_path = payload.get("index_path")
+            index = HeaderIndex(Path(str(index_path)).expanduser() if index_path else None)
+        return clean_inbox(
+            root,
+            fmt,
+            criteria,
+            dry_run=dry_run,
+            action=action,
+            dest=dest,
+            top_n=top_n,
+            max_actions=max_actions,
+            batch_size=batch_size,
+            workers=workers,
+            index=index,
+        )
+    except sqlite3.OperationalError as exc:
+        if not is_busy(exc):
+            raise
+        return {
+            "status": "error",
+            "error": "index_busy",
+            "detail": f"Inbox index is locked by another sync; try again shortly ({exc})",
+        }
+    finally:
+        if index is not None:
+            index.close()
@@ -7,24 +7,56 @@ Tool contract (minimal, for now):
 - module exposes a dict `TOOL_DEFINITION` { id, name, icon, description }
 - module optionally exposes `run(payload: dict) -> Any`
 
+Discovery is import-free: each module's `TOOL_DEFINITION` is read statically
+(see `contract.read_module_static`) into a manifest that is cached in memory
+by (mtime, size) and on disk by file hash (`KIT_MANIFEST_CACHE`). A tool's
+module is imported only on its first run; `prewarm()` can import popular
+tools in the background after startup (`KIT_PREWARM_TOOLS`).
+
+`TOOLS`/`RUNNERS` are per-process and rebuilt from disk by every worker;
+run counts and background job results live in the shared state store
+(`app.state`) so every worker sees the same numbers.
+
 Note: Kit deliberately avoids mock/demo tools. If a tool isn't real enough to
 ship, it shouldn't be discoverable.
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import importlib
-import pkgutil
+import json
+import os
+import threading
 from dataclasses import asdict, dataclass
+from pathlib import Path
 from types import ModuleType
-from typing import Any, Callable, Dict, List, Optional
-
-from fastapi import APIRouter, HTTPException
-
-from .contract import coerce_contract, validate_tool_definition
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app import tracing
+from app.cancellation import (
+    CLIENT_DISCONNECTED,
+    DEADLINE_EXCEEDED,
+    Cancelled,
+    CancelToken,
+    request_deadline,
+    use_token,
+    watch_disconnect,
+)
+from app.serialization import FastJSONResponse
+from app.state import get_state
+
+from .contract import coerce_contract, read_module_static, validate_tool_definition
 
 router = APIRouter()
 
+MODULES_DIR = Path(__file__).resolve().parent
+PACKAGE = "app.modules"
+
 
 @dataclass(frozen=True)
 class Tool:
@@ -34,18 +66,99 @@ class Tool:
     description: str = ""
     module: str = ""
     version: str = "0.0.0"
+    max_runtime_s: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class _ManifestEntry:
+    sha256: str
+    tool_definition: Any
+    has_run: bool
 
 
 TOOLS: Dict[str, Tool] = {}
 RUNNERS: Dict[str, Callable[..., Any]] = {}
 
+# tool id -> (module name, source hash) for tools with a `run`
+_RUNNABLE: Dict[str, Tuple[str, str]] = {}
+# module name -> source hash it was imported at
+_LOADED: Dict[str, str] = {}
+# path -> ((mtime_ns, size), entry)
+_MANIFEST: Dict[str, Tuple[Tuple[int, int], _ManifestEntry]] = {}
+# sha256 -> {"td": ..., "has_run": ...} (persisted)
+_DISK_CACHE: Optional[Dict[str, Dict[str, Any]]] = None
+
+_lock = threading.RLock()
+_import_lock = threading.Lock()
+
 
 def _is_loadable_module(name: str) -> bool:
     return not (name.startswith("_") or name in {"registry"})
 
 
-def _extract_tool(module: ModuleType, fallback_id: str) -> Optional[Tool]:
-    td = getattr(module, "TOOL_DEFINITION", None)
+def manifest_cache_path() -> Path:
+    default = MODULES_DIR.parents[1] / ".cache" / "tool_manifest.json"
+    return Path(os.getenv("KIT_MANIFEST_CACHE", str(default))).expanduser()
+
+
+def _load_disk_cache() -> Dict[str, Dict[str, Any]]:
+    global _DISK_CACHE
+    if _DISK_CACHE is None:
+        try:
+            doc = json.loads(manifest_cache_path().read_text())
+            _DISK_CACHE = dict(doc.get("entries") or {})
+        except (OSError, ValueError, TypeError):
+            _DISK_CACHE = {}
+    return _DISK_CACHE
+
+
+def save_manifest_cache() -> None:
+    """Persist manifest entries (best effort)."""
+
+    with _lock:
+        entries = dict(_load_disk_cache())
+    path = manifest_cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"entries": entries}))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _manifest_entry(path: Path) -> Optional[_ManifestEntry]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _MANIFEST.get(str(path))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    data = path.read_bytes()
+    sha = hashlib.sha256(data).hexdigest()
+    disk = _load_disk_cache()
+    hit = disk.get(sha)
+    if hit is not None:
+        entry = _ManifestEntry(sha, hit["td"], bool(hit["has_run"]))
+    else:
+        with tracing.span("registry.parse", module=path.stem):
+            info = read_module_static(data.decode("utf-8", "replace"), str(path))
+        entry = _ManifestEntry(sha, info.tool_definition, info.has_run)
+        try:
+            json.dumps(entry.tool_definition)
+        except (TypeError, ValueError):
+            pass  # not JSON-representable; keep it in memory only
+        else:
+            disk[sha] = {"td": entry.tool_definition, "has_run": entry.has_run}
+
+    _MANIFEST[str(path)] = (stamp, entry)
+    return entry
+
+
+def _tool_from_definition(td: Any, module_name: str, fallback_id: str) -> Optional[Tool]:
     validation = validate_tool_definition(td)
     if not validation.ok:
         # Keep it out of discovery entirely; unsafe/incomplete.
@@ -58,34 +171,141 @@ def _extract_tool(module: ModuleType, fallback_id: str) -> Optional[Tool]:
         name=str(contract.name or fallback_id),
         icon=str(getattr(contract, "icon", "tool")),
         description=str(contract.description),
-        module=str(td.get("module", module.__name__)),
+        module=str(td.get("module", module_name)),
         version=str(contract.version),
+        max_runtime_s=contract.max_runtime_s,
     )
 
 
+def _extract_tool(module: ModuleType, fallback_id: str) -> Optional[Tool]:
+    return _tool_from_definition(getattr(module, "TOOL_DEFINITION", None), module.__name__, fallback_id)
+
+
 def discover_tools() -> List[Tool]:
-    """Scan `app.modules` and register all tools."""
+    """Scan `app/modules` and register all tools (without importing them)."""
+
+    with tracing.span("registry.discover") as sp:
+        with _lock:
+            TOOLS.clear()
+            _RUNNABLE.clear()
+            disk = _load_disk_cache()
+            known = set(disk)
+            current = set()
+
+            for path in sorted(MODULES_DIR.glob("*.py")):
+                if not _is_loadable_module(path.stem):
+                    continue
+
+                entry = _manifest_entry(path)
+                if entry is None:
+                    continue
+                current.add(entry.sha256)
+
+                full_name = f"{PACKAGE}.{path.stem}"
+                tool = _tool_from_definition(entry.tool_definition, full_name, fallback_id=path.stem)
+                if not tool:
+                    continue
+                TOOLS[tool.id] = tool
+                if entry.has_run:
+                    _RUNNABLE[tool.id] = (full_name, entry.sha256)
+
+            # Drop runners whose tool disappeared or whose source changed.
+            for tool_id in list(RUNNERS):
+                spec = _RUNNABLE.get(tool_id)
+                if spec is None or _LOADED.get(spec[0]) != spec[1]:
+                    RUNNERS.pop(tool_id, None)
+
+            dirty = set(disk) != known
+            if dirty:
+                # Only keep entries for sources that still exist.
+                for sha in set(disk) - current:
+                    del disk[sha]
+
+        if dirty:
+            save_manifest_cache()
+        if sp is not None:
+            sp.set(tools=len(TOOLS))
 
-    TOOLS.clear()
-    RUNNERS.clear()
+    return list(TOOLS.values())
 
-    pkg = importlib.import_module("app.modules")
-    for modinfo in pkgutil.iter_modules(pkg.__path__):
-        if not _is_loadable_module(modinfo.name):
-            continue
 
-        full_name = f"app.modules.{modinfo.name}"
-        module = importlib.import_module(full_name)
+def get_runner(tool_id: str) -> Optional[Callable[..., Any]]:
+    """Return a tool's runner, importing its module on first use."""
 
-        tool = _extract_tool(module, fallback_id=modinfo.name)
-        if tool:
-            TOOLS[tool.id] = tool
+    runner = RUNNERS.get(tool_id)
+    if runner is not None:
+        return runner
 
+    with _lock:
+        spec = _RUNNABLE.get(tool_id)
+    if spec is None:
+        return None
+    full_name, sha = spec
+
+    # Imports get their own lock so a slow import never blocks discovery.
+    with _import_lock:
+        runner = RUNNERS.get(tool_id)
+        if runner is not None:
+            return runner
+        with tracing.span("registry.import", module=full_name):
+            module = importlib.import_module(full_name)
+            if full_name in _LOADED and _LOADED[full_name] != sha:
+                module = importlib.reload(module)
+
+        # The imported module is authoritative: it must still be the same
+        # valid tool the manifest advertised.
+        tool = _extract_tool(module, fallback_id=full_name.rsplit(".", 1)[-1])
         runner = getattr(module, "run", None)
-        if tool and callable(runner):
-            RUNNERS[tool.id] = runner
+        if not tool or tool.id != tool_id or not callable(runner):
+            return None
+        with _lock:
+            _LOADED[full_name] = sha
+            RUNNERS[tool_id] = runner
+        return runner
+
+
+def _prewarm_ids(setting: str) -> List[str]:
+    setting = setting.strip()
+    if not setting:
+        return []
+    if setting == "*":
+        return list(_RUNNABLE)
+    if setting == "popular":
+        try:
+            top = int(os.getenv("KIT_PREWARM_TOP") or 3)
+        except ValueError:
+            top = 3
+        prefix = "tool.runs."
+        runs = get_state().metrics(prefix)
+        ranked = sorted(runs, key=runs.__getitem__, reverse=True)
+        return [name[len(prefix) :] for name in ranked if name[len(prefix) :] in _RUNNABLE][:top]
+    return [t.strip() for t in setting.split(",") if t.strip() in _RUNNABLE]
+
+
+def prewarm(setting: Optional[str] = None) -> Optional[threading.Thread]:
+    """Import tools in a background thread.
+
+    `setting` (default `KIT_PREWARM_TOOLS`): empty = off, `popular` = the most
+    run tools (`KIT_PREWARM_TOP`, default 3), `*` = all, or a comma list.
+    """
+
+    if not TOOLS:
+        discover_tools()
+    ids = _prewarm_ids(os.getenv("KIT_PREWARM_TOOLS", "") if setting is None else setting)
+    if not ids:
+        return None
 
-    return list(TOOLS.values())
+    def _warm() -> None:
+        for tool_id in ids:
+            try:
+                get_runner(tool_id)
+            except Exception:  # noqa: BLE001
+                # A broken tool surfaces on its first real run instead.
+                pass
+
+    t = threading.Thread(target=_warm, name="kit-prewarm", daemon=True)
+    t.start()
+    return t
 
 
 @router.get("/list")
@@ -93,17 +313,83 @@ async def list_modules():
     return [asdict(t) for t in discover_tools()]
 
 
-@router.post("/run/{tool_id}")
-async def run_tool(tool_id: str, payload: Dict[str, Any]):
+async def _require_runner(tool_id: str) -> Tuple[Tool, Callable[..., Any]]:
     discover_tools()
 
     tool = TOOLS.get(tool_id)
     if not tool:
         raise HTTPException(status_code=404, detail=f"Unknown tool: {tool_id}")
 
-    runner = RUNNERS.get(tool_id)
+    # A first run imports the tool, which may be slow or wait on a prewarm
+    # import; keep that off the event loop.
+    runner = await run_in_threadpool(get_runner, tool_id)
     if not runner:
         raise HTTPException(status_code=501, detail=f"Tool has no runner: {tool_id}")
+    get_state().incr(f"tool.runs.{tool_id}")
+    return tool, runner
+
+
+def _call_runner(runner: Callable[..., Any], payload: Dict[str, Any], token: CancelToken) -> Any:
+    # Runs in a worker thread so the event loop can notice disconnects.
+    with use_token(token), tracing.profile_thread():
+        try:
+            return runner(payload)
+        except Cancelled as exc:
+            return {"status": "cancelled", "reason": exc.reason}
 
-    result = runner(payload)
-    return {"tool_id": tool_id, "result": result}
+
+def _was_cancelled(tool_id: str, result: Any) -> Optional[str]:
+    if isinstance(result, dict) and result.get("status") == "cancelled":
+        reason = str(result.get("reason") or "cancelled")
+        get_state().incr(f"cancelled.tool.{tool_id}.{reason}")
+        return reason
+    return None
+
+
+@router.post("/run/{tool_id}")
+async def run_tool(tool_id: str, payload: Dict[str, Any], request: Request):
+    tool, runner = await _require_runner(tool_id)
+    token = CancelToken(deadline=request_deadline(request.headers, tool.max_runtime_s))
+
+    watcher = asyncio.ensure_future(watch_disconnect(request, token))
+    try:
+        with tracing.span("registry.run_tool", tool_id=tool_id):
+            result = await run_in_threadpool(_call_runner, runner, payload, token)
+    finally:
+        watcher.cancel()
+
+    reason = _was_cancelled(tool_id, result)
+    status_code = {DEADLINE_EXCEEDED: 504, CLIENT_DISCONNECTED: 499}.get(reason or "", 200)
+    with tracing.span("registry.serialize", tool_id=tool_id):
+        return FastJSONResponse({"tool_id": tool_id, "result": result}, status_code=status_code)
+
+
+def _run_job(job_id: str, tool: Tool, runner: Callable[..., Any], payload: Dict[str, Any]) -> None:
+    state = get_state()
+    state.update_job(job_id, "running")
+    token = CancelToken(deadline=request_deadline({}, tool.max_runtime_s))
+    try:
+        result = _call_runner(runner, payload, token)
+    except Exception as exc:  # noqa: BLE001
+        state.update_job(job_id, "error", error=str(exc))
+        state.incr(f"tool.errors.{tool.id}")
+        return
+    state.update_job(job_id, "cancelled" if _was_cancelled(tool.id, result) else "success", result=result)
+
+
+@router.post("/jobs/{tool_id}", status_code=202)
+async def submit_job(tool_id: str, payload: Dict[str, Any], background: BackgroundTasks):
+    """Run a tool after responding; poll `GET /modules/jobs/{job_id}` from any worker."""
+
+    tool, runner = await _require_runner(tool_id)
+    job_id = get_state().create_job(tool_id)
+    background.add_task(_run_job, job_id, tool, runner, payload)
+    return {"job_id": job_id, "tool_id": tool_id, "status": "queued"}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = get_state().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
@@ -21,6 +21,8 @@ import time
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
+from app.tracing import span
+
 
 TOOL_DEFINITION = {
     "id": "health",
@@ -145,15 +147,18 @@ def run(payload: dict):
         {"step": "execute", "note": "derive summary"},
     ]
 
-    ok, out, reason = _snapshot(disk_path)
+    with span("ralph.observe", tool="health"):
+        ok, out, reason = _snapshot(disk_path)
     if not ok:
         trace.append({"step": "self_correct", "note": f"snapshot failed: {reason}; retrying"})
-        ok, out, reason = _snapshot(disk_path)
+        with span("ralph.self_correct", tool="health"):
+            ok, out, reason = _snapshot(disk_path)
         if not ok:
             return {"status": "failed", "detail": reason, "trace": trace}
 
     trace.append({"step": "verify", "note": "sanity-check invariants"})
-    vok, vmsg = _verify(out)
+    with span("ralph.verify", tool="health"):
+        vok, vmsg = _verify(out)
     if not vok:
         trace.append({"step": "self_correct", "note": f"verify failed: {vmsg}"})
         return {"status": "failed", "detail": vmsg, "trace": trace, "data": out}
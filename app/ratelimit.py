@@ -0,0 +1,202 @@
+"""Per-client rate limiting and admission control for /proxy and /modules.
+
+Two checks, both answered before the request reaches the app:
+
+- Token buckets per (route class, client). The client is the peer IP, or
+  the first `X-Forwarded-For` hop if `KIT_TRUST_FORWARDED=1`. Kit never
+  validates `Authorization` (the engine does), so it can't identify a client:
+  a fresh fake token per request would get a fresh bucket. An empty bucket
+  answers 429 with `Retry-After` set to when the next token arrives.
+- In-flight watermarks per route class (upstream proxy calls, tool runs and
+  jobs). Above the watermark the request is shed with 503 and
+  `Retry-After: 1`.
+
+Settings per class (`PROXY`, `MODULES`):
+- `KIT_RATE_<CLASS>_PER_S`: refill rate; 0 disables the bucket
+- `KIT_RATE_<CLASS>_BURST`: bucket size
+- `KIT_MAX_INFLIGHT_<CLASS>`: watermark; 0 disables it
+
+State is confined to the worker's event loop, so no locks are needed. Buckets
+are spread over shards so idle ones can be pruned a shard at a time without
+walking every client. Limits apply per worker process.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.state import get_state
+
+logger = logging.getLogger(__name__)
+
+SHARDS = 64
+# Prune idle buckets from a shard once it holds this many (at least).
+SHARD_PRUNE_AT = 512
+
+
+@dataclass(frozen=True)
+class Limits:
+    rate: float
+    burst: float
+    max_inflight: int
+
+    @classmethod
+    def from_env(cls, name: str, *, rate: float, burst: float, max_inflight: int) -> "Limits":
+        return cls(
+            rate=_env_number(f"KIT_RATE_{name}_PER_S", rate, float),
+            burst=_env_number(f"KIT_RATE_{name}_BURST", burst, float),
+            max_inflight=_env_number(f"KIT_MAX_INFLIGHT_{name}", max_inflight, int),
+        )
+
+
+def _env_number(var: str, default: Any, parse: Callable[[str], Any]) -> Any:
+    raw = os.getenv(var)
+    if not raw:
+        return default
+    try:
+        return parse(raw)
+    except ValueError:
+        logger.warning("Ignoring %s=%r: not a number; using %s", var, raw, default)
+        return default
+
+
+def default_limits() -> Dict[str, Limits]:
+    return {
+        "proxy": Limits.from_env("PROXY", rate=20, burst=40, max_inflight=64),
+        "modules": Limits.from_env("MODULES", rate=5, burst=10, max_inflight=8),
+    }
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    if path.startswith("/proxy/"):
+        return "proxy"
+    if method == "POST" and path.startswith(("/modules/run/", "/modules/jobs/")):
+        return "modules"
+    return None
+
+
+def client_key(scope: Scope, trust_forwarded: bool = False) -> str:
+    if trust_forwarded:
+        forwarded = Headers(scope=scope).get("x-forwarded-for", "").split(",")[0].strip()
+        if forwarded:
+            return "ip:" + forwarded
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class TokenBuckets:
+    """Sharded token buckets: key -> [tokens, last_refill]."""
+
+    def __init__(self, rate: float, burst: float, *, clock=time.monotonic) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.clock = clock
+        self._shards: List[Dict[str, List[float]]] = [{} for _ in range(SHARDS)]
+        self._prune_at = [SHARD_PRUNE_AT] * SHARDS
+
+    def acquire(self, key: str) -> float:
+        """Take one token; returns 0 on success, else seconds until one is free."""
+
+        idx = hash(key) % SHARDS
+        shard = self._shards[idx]
+        now = self.clock()
+        bucket = shard.get(key)
+        if bucket is None:
+            if len(shard) >= self._prune_at[idx]:
+                self._prune(shard, now)
+                # Many live clients: back off so pruning stays amortized O(1).
+                self._prune_at[idx] = max(SHARD_PRUNE_AT, 2 * len(shard))
+            shard[key] = [self.burst - 1.0, now]
+            return 0.0
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / self.rate
+
+    def _prune(self, shard: Dict[str, List[float]], now: float) -> None:
+        # A bucket that has refilled completely is the same as no bucket.
+        full_after = self.burst / self.rate
+        for key in [k for k, (_tokens, last) in shard.items() if now - last >= full_after]:
+            del shard[key]
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, *, limits: Optional[Dict[str, Limits]] = None) -> None:
+        self.app = app
+        self.limits = default_limits() if limits is None else limits
+        self.trust_forwarded = os.getenv("KIT_TRUST_FORWARDED", "") == "1"
+        self.buckets = {
+            name: TokenBuckets(lim.rate, lim.burst) for name, lim in self.limits.items() if lim.rate > 0
+        }
+        self.inflight: Dict[str, int] = {name: 0 for name in self.limits}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        cls = route_class(scope.get("method", ""), scope.get("path", "")) if scope["type"] == "http" else None
+        if cls is None or cls not in self.limits:
+            await self.app(scope, receive, send)
+            return
+
+        rejected = self._check(cls, scope)
+        if rejected is not None:
+            status, retry_after = rejected
+            get_state().incr(f"{'ratelimit.rejected' if status == 429 else 'admission.shed'}.{cls}")
+            await _reject(scope, send, status, retry_after)
+            return
+
+        self.inflight[cls] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight[cls] -= 1
+
+    def _check(self, cls: str, scope: Scope) -> Optional[Tuple[int, int]]:
+        lim = self.limits[cls]
+        if lim.max_inflight > 0 and self.inflight[cls] >= lim.max_inflight:
+            return 503, 1
+        buckets = self.buckets.get(cls)
+        if buckets is not None:
+            wait = buckets.acquire(client_key(scope, self.trust_forwarded))
+            if wait > 0:
+                return 429, max(1, math.ceil(wait))
+        return None
+
+
+async def _reject(scope: Scope, send: Send, status: int, retry_after: int) -> None:
+    if status == 429:
+        content = {
+            "error": "Hold your horses!",
+            "detail": "Too many requests from this client.",
+            "hint": f"Try again in {retry_after}s.",
+        }
+    else:
+        content = {
+            "error": "All circuits are busy!",
+            "detail": "Kit is at capacity right now.",
+            "hint": f"Try again in {retry_after}s.",
+        }
+    content["path"] = scope.get("path", "")
+    body = json.dumps(content).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,62 @@
+"""Fast JSON encoding for tool results.
+
+Tool results are almost always plain dicts/lists/str/int/float already, so
+walking them with FastAPI's `jsonable_encoder` before `json.dumps` only
+costs time. `dumps()` serializes directly and falls back to
+`jsonable_encoder` per object, only for values the encoder can't handle
+natively (dataclasses, Paths, datetimes, sets, ...).
+
+`orjson` is used when installed (optional dependency), else the stdlib
+encoder with the same compact settings FastAPI uses.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+try:  # optional
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None  # type: ignore[assignment]
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _fallback(obj: Any) -> Any:
+    encoded = jsonable_encoder(obj)
+    if encoded is obj:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return encoded
+
+
+def _dumps_stdlib(obj: Any) -> bytes:
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_fallback,
+    ).encode("utf-8")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize `obj` to compact UTF-8 JSON bytes."""
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_fallback, option=orjson.OPT_NON_STR_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            # e.g. ints beyond 64 bits; the stdlib encoder handles those.
+            pass
+    return _dumps_stdlib(obj)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,69 @@
+"""Multi-worker launcher.
+
+    python -m app.serve --workers 4
+
+Runs `app.main:app` under uvicorn's process supervisor: one worker per core
+by default, dead workers are replaced, `SIGHUP` restarts workers one at a
+time, and `SIGTERM`/`SIGINT` let in-flight requests (and queued background
+jobs) finish for up to `--graceful-timeout` seconds. Shared state lives in
+the SQLite store from `app.state`, so any worker can answer any request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from typing import List, Optional
+
+import uvicorn
+
+from app.modules import registry
+from app.state import SharedState
+
+
+def _prepare() -> None:
+    # Create the state DB and warm the manifest cache once, in the parent,
+    # so workers don't race to do it on startup.
+    SharedState().close()
+    registry.discover_tools()
+    registry.save_manifest_cache()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run Kit with several worker processes.")
+    parser.add_argument("--host", default=os.getenv("KIT_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("KIT_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("KIT_WORKERS", "0")) or os.cpu_count() or 1,
+        help="worker processes (default: KIT_WORKERS or CPU count)",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=float(os.getenv("KIT_GRACEFUL_TIMEOUT", "30")),
+        help="seconds to let in-flight requests finish on shutdown",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=int(os.getenv("KIT_MAX_REQUESTS", "0")),
+        help="recycle a worker after this many requests (0 = never)",
+    )
+    args = parser.parse_args(argv)
+
+    _prepare()
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,255 @@
+"""Process-shared state for multi-worker deployments.
+
+Everything that must look the same whichever worker serves a request lives
+in one local SQLite database in WAL mode (`KIT_STATE_DB`, default
+`.cache/kit_state.sqlite`); no external service is needed:
+
+- jobs: background tool runs and their results; finished jobs are deleted
+  `KIT_JOB_TTL_S` seconds (default 86400) after their last update
+- metrics: counters; increments are buffered per process and flushed about
+  once a second (`KIT_METRICS_FLUSH_S`) so the hot path never waits on disk
+
+Each thread gets its own connection and `close()` closes all of them;
+`get_state()` returns the per-process instance (re-created after a fork).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app import serialization
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tool_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    pid INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at);
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+JOB_STATES = {"queued", "running", "success", "error", "cancelled", "lost"}
+FINISHED_JOB_STATES = ("success", "error", "cancelled", "lost")
+# The flush thread prunes expired jobs at most this often.
+JOB_PRUNE_EVERY_S = 60.0
+
+
+def _env_float(var: str, default: float) -> float:
+    try:
+        return float(os.getenv(var) or default)
+    except ValueError:
+        return default
+
+
+def default_state_path() -> Path:
+    default = Path(__file__).resolve().parents[1] / ".cache" / "kit_state.sqlite"
+    return Path(os.getenv("KIT_STATE_DB", str(default))).expanduser()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedState:
+    def __init__(self, path: Optional[Path] = None, *, flush_interval: Optional[float] = None) -> None:
+        self.path = Path(path) if path is not None else default_state_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = (
+            float(os.getenv("KIT_METRICS_FLUSH_S", "1.0")) if flush_interval is None else flush_interval
+        )
+        self._local = threading.local()
+        self._pending: Counter = Counter()
+        self._pending_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self.job_ttl = _env_float("KIT_JOB_TTL_S", 86400.0)
+        self._pruned_at = 0.0
+
+        db = self._conn()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        self.prune_jobs()
+
+    def _conn(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Only the owning thread uses it; close() may run on another one.
+            db = sqlite3.connect(str(self.path), timeout=10, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._conns_lock:
+                self._conns.append(db)
+        return db
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for db in conns:
+            db.close()
+        self._local = threading.local()
+
+    # --- jobs ---
+
+    def create_job(self, tool_id: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, tool_id, status, pid, host, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, tool_id, os.getpid(), os.uname().nodename, now, now),
+        )
+        return job_id
+
+    def update_job(self, job_id: str, status: str, *, result: Any = None, error: Optional[str] = None) -> None:
+        if status not in JOB_STATES:
+            raise ValueError(f"unknown job status: {status}")
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, pid = ?, updated_at = ? WHERE id = ?",
+            (
+                status,
+                None if result is None else serialization.dumps(result).decode("utf-8"),
+                error,
+                os.getpid(),
+                time.time(),
+                job_id,
+            ),
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT id, tool_id, status, result, error, pid, host, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "tool_id", "status", "result", "error", "pid", "host", "created_at", "updated_at"), row))
+        job["result"] = None if job["result"] is None else json.loads(job["result"])
+
+        # A job whose worker died (restart/crash) will never finish.
+        if (
+            job["status"] in {"queued", "running"}
+            and job["host"] == os.uname().nodename
+            and not _pid_alive(int(job["pid"]))
+        ):
+            self.update_job(job_id, "lost", error="worker exited before the job finished")
+            job["status"], job["error"] = "lost", "worker exited before the job finished"
+        return job
+
+    def prune_jobs(self) -> int:
+        """Delete finished jobs not updated for `job_ttl` seconds."""
+
+        self._pruned_at = time.time()
+        if self.job_ttl <= 0:
+            return 0
+        placeholders = ", ".join("?" for _ in FINISHED_JOB_STATES)
+        return self._conn().execute(
+            f"DELETE FROM jobs WHERE updated_at < ? AND status IN ({placeholders})",
+            (self._pruned_at - self.job_ttl, *FINISHED_JOB_STATES),
+        ).rowcount
+
+    # --- metrics ---
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._pending_lock:
+            self._pending[name] += n
+        if self._flusher is None and self.flush_interval > 0:
+            self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        with self._pending_lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="kit-metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.time() - self._pruned_at >= JOB_PRUNE_EVERY_S:
+                    self.prune_jobs()
+            except sqlite3.Error:
+                pass  # retried on the next tick
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+        db = self._conn()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT INTO metrics (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                list(pending.items()),
+            )
+            db.execute("COMMIT")
+        except sqlite3.Error:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            with self._pending_lock:
+                self._pending.update(pending)
+            raise
+
+    def metrics(self, prefix: str = "") -> Dict[str, int]:
+        self.flush()
+        rows = self._conn().execute(
+            "SELECT name, value FROM metrics WHERE name LIKE ? ESCAPE '\\' ORDER BY name",
+            (prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%",),
+        ).fetchall()
+        return {name: int(value) for name, value in rows}
+
+
+_state: Optional[SharedState] = None
+_state_pid: Optional[int] = None
+_state_lock = threading.Lock()
+
+
+def get_state() -> SharedState:
+    global _state, _state_pid
+    with _state_lock:
+        if _state is None or _state_pid != os.getpid():
+            _state = SharedState()
+            _state_pid = os.getpid()
+        return _state
+
+
+def reset_state() -> None:
+    """Close and forget the per-process state (tests, shutdown)."""
+
+    global _state, _state_pid
+    with _state_lock:
+        if _state is not None and _state_pid == os.getpid():
+            _state.close()
+        _state = None
+        _state_pid = None
@@ -0,0 +1,442 @@
+"""Hot-path tracing and opt-in profiling for Kit.
+
+Spans are cheap, local and dependency-free:
+
+- `span(name, **attrs)` is a context manager that records timing for one
+  phase (proxy upstream call, discovery, a Ralph Loop step, ...).
+- A trace is only recorded when the request was sampled
+  (`KIT_TRACE_SAMPLE_RATE`, 0.0-1.0, default 0.0). Unsampled requests pay for a
+  single contextvar lookup per span.
+- Finished traces go to a pluggable exporter (`KIT_TRACE_EXPORTER`):
+  - `jsonl` (default): one JSON object per span in `KIT_TRACE_FILE`
+  - `otlp`: one OTLP/JSON `ExportTraceServiceRequest` per trace (the format
+    used by the OpenTelemetry collector's file exporter/receiver)
+  - `none`: drop spans
+
+Profiling is per request and opt-in. When `KIT_PROFILING_ENABLED=1`, a client
+may send `X-Kit-Profile: cprofile` (deterministic) or `X-Kit-Profile: sample`
+(statistical, lower overhead) and gets a compact summary back in the
+`X-Kit-Profile-Summary` response header. Work the request hands to a worker
+thread is covered when it runs inside `profile_thread()`.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol
+
+
+PROFILE_HEADER = "x-kit-profile"
+PROFILE_SUMMARY_HEADER = "X-Kit-Profile-Summary"
+PROFILE_MODES = {"cprofile", "sample"}
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+
+    @property
+    def duration_ms(self) -> float:
+        return round((self.end_ns - self.start_ns) / 1_000_000, 3)
+
+    def set(self, **attrs: Any) -> None:
+        self.attributes.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: List[Span]) -> None:
+        ...
+
+
+class NullExporter:
+    def export(self, spans: List[Span]) -> None:
+        _ = spans
+
+
+class JsonlExporter:
+    """Append one JSON line per span to a local file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        self._append("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans))
+
+    def _append(self, text: str) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # One unbuffered O_APPEND write per batch so lines from several
+            # worker processes never interleave.
+            with self.path.open("ab", buffering=0) as f:
+                f.write(text.encode("utf-8"))
+
+
+def _otlp_value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+class OtlpFileExporter(JsonlExporter):
+    """Append one OTLP/JSON trace export request per trace."""
+
+    def export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        otlp_spans = [
+            {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 1 if s.status == "ok" else 2},
+            }
+            for s in spans
+        ]
+        doc = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": {"stringValue": "kit-middleware"}}]
+                    },
+                    "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": otlp_spans}],
+                }
+            ]
+        }
+        self._append(json.dumps(doc) + "\n")
+
+
+def _exporter_from_env() -> SpanExporter:
+    kind = os.getenv("KIT_TRACE_EXPORTER", "jsonl").strip().lower()
+    path = os.getenv("KIT_TRACE_FILE", "kit_traces.jsonl")
+    if kind == "otlp":
+        return OtlpFileExporter(path)
+    if kind == "jsonl":
+        return JsonlExporter(path)
+    return NullExporter()
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def get_exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = _exporter_from_env()
+    return _exporter
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Install a custom exporter (None re-reads the env on next use)."""
+
+    global _exporter
+    _exporter = exporter
+
+
+def sample_rate() -> float:
+    try:
+        rate = float(os.getenv("KIT_TRACE_SAMPLE_RATE", "0"))
+    except ValueError:
+        return 0.0
+    return max(0.0, min(1.0, rate))
+
+
+def should_sample() -> bool:
+    rate = sample_rate()
+    return rate > 0.0 and (rate >= 1.0 or random.random() < rate)
+
+
+class _Trace:
+    def __init__(self) -> None:
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, s: Span) -> None:
+        with self._lock:
+            self.spans.append(s)
+
+
+_trace: ContextVar[Optional[_Trace]] = ContextVar("kit_trace", default=None)
+_parent: ContextVar[Optional[Span]] = ContextVar("kit_span", default=None)
+
+
+@contextmanager
+def _noop() -> Iterator[None]:
+    yield None
+
+
+@contextmanager
+def _record(trace: _Trace, name: str, attrs: Dict[str, Any]) -> Iterator[Span]:
+    parent = _parent.get()
+    s = Span(
+        name=name,
+        trace_id=trace.trace_id,
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attrs,
+    )
+    token = _parent.set(s)
+    try:
+        yield s
+    except BaseException as exc:
+        s.status = "error"
+        s.attributes["exception"] = type(exc).__name__
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _parent.reset(token)
+        trace.add(s)
+
+
+def span(name: str, **attrs: Any):
+    """Time a phase of the current request; a no-op when not sampled.
+
+    Yields the `Span` (or None when not sampled), so callers that want to add
+    attributes after the fact should guard on it.
+    """
+
+    trace = _trace.get()
+    if trace is None:
+        return _noop()
+    return _record(trace, name, attrs)
+
+
+@contextmanager
+def trace_request(name: str, *, force: bool = False, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Open a root span for one request and export it when done."""
+
+    if not (force or should_sample()):
+        yield None
+        return
+
+    trace = _Trace()
+    token = _trace.set(trace)
+    try:
+        with _record(trace, name, attrs) as root:
+            yield root
+    finally:
+        _trace.reset(token)
+        try:
+            get_exporter().export(sorted(trace.spans, key=lambda s: s.start_ns))
+        except Exception:  # noqa: BLE001
+            # Tracing must never break a request.
+            pass
+
+
+def server_timing(root: Optional[Span], limit: int = 12) -> Optional[str]:
+    """Render the root's trace as a `Server-Timing` header value."""
+
+    if root is None:
+        return None
+    trace = _trace.get()
+    spans = trace.spans if trace else []
+    parts = [f"{s.name.replace(' ', '_')};dur={s.duration_ms}" for s in spans[:limit]]
+    return ", ".join(parts) or None
+
+
+# --- Profiling ---
+
+# Only one profiler can be active per interpreter; concurrent opt-in requests
+# are told so instead of corrupting each other's numbers.
+_profile_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("KIT_PROFILING_ENABLED", "0").strip().lower() in {"1", "true", "yes"}
+
+
+def requested_profile_mode(headers: Any) -> Optional[str]:
+    if not profiling_enabled():
+        return None
+    mode = str(headers.get(PROFILE_HEADER, "")).strip().lower()
+    return mode if mode in PROFILE_MODES else None
+
+
+def _short_func(filename: str, lineno: int, func: str) -> str:
+    return f"{Path(filename).name}:{lineno}({func})"
+
+
+class _Sampler:
+    """Tiny statistical profiler: periodically samples one thread's stack."""
+
+    def __init__(self, thread_id: int, interval_s: float) -> None:
+        self.thread_ids = {thread_id}
+        self.interval_s = interval_s
+        self.samples: Counter = Counter()
+        self.total = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="kit-sampler", daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()  # noqa: SLF001
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                self.total += 1
+                # Attribute the sample to the innermost frame (self time).
+                code = frame.f_code
+                self.samples[_short_func(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self, top: int) -> str:
+        if not self.total:
+            return "sample: no samples"
+        parts = [f"{k} {round(100 * n / self.total, 1)}%" for k, n in self.samples.most_common(top)]
+        return f"sample n={self.total}; " + "; ".join(parts)
+
+
+@dataclass
+class _ActiveProfile:
+    mode: str
+    sampler: Optional[_Sampler] = None
+    thread_profiles: List[cProfile.Profile] = field(default_factory=list)
+    done: bool = False
+
+
+_active_profile: ContextVar[Optional[_ActiveProfile]] = ContextVar("kit_active_profile", default=None)
+
+
+def _cprofile_summary(prof: cProfile.Profile, top: int, extra: Iterable[cProfile.Profile] = ()) -> str:
+    st = pstats.Stats(prof)
+    for other in extra:
+        st.add(other)
+    rows = sorted(st.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:top]  # type: ignore[attr-defined]
+    parts = [
+        f"{_short_func(*func)} calls={nc} tot={round(tt * 1000, 2)}ms cum={round(ct * 1000, 2)}ms"
+        for func, (_cc, nc, tt, ct, _callers) in rows
+    ]
+    return "cprofile; " + "; ".join(parts)
+
+
+@contextmanager
+def profile(mode: Optional[str], top: int = 10) -> Iterator[Dict[str, str]]:
+    """Profile the enclosed block; the summary lands in the yielded dict."""
+
+    out: Dict[str, str] = {}
+    if mode not in PROFILE_MODES:
+        yield out
+        return
+
+    if not _profile_lock.acquire(blocking=False):
+        out["summary"] = "busy: another request is being profiled"
+        yield out
+        return
+
+    try:
+        active = _ActiveProfile(mode)
+        token = _active_profile.set(active)
+        try:
+            if mode == "cprofile":
+                prof = cProfile.Profile()
+                prof.enable()
+                try:
+                    yield out
+                finally:
+                    prof.disable()
+                    out["summary"] = _cprofile_summary(prof, top, active.thread_profiles)
+            else:
+                try:
+                    interval = float(os.getenv("KIT_PROFILE_SAMPLE_INTERVAL_MS") or 5) / 1000
+                except ValueError:
+                    interval = 0.005
+                active.sampler = _Sampler(threading.get_ident(), max(0.0005, interval))
+                active.sampler.start()
+                try:
+                    yield out
+                finally:
+                    active.sampler.stop()
+                    out["summary"] = active.sampler.summary(top)
+        finally:
+            active.done = True
+            try:
+                _active_profile.reset(token)
+            except ValueError:
+                # Closed from another task's context (e.g. when the response
+                # starts inside a streaming task); `done` covers that case.
+                pass
+    finally:
+        _profile_lock.release()
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """Extend the current request's profile (if any) to this worker thread."""
+
+    active = _active_profile.get()
+    if active is None or active.done:
+        yield
+        return
+    if active.sampler is not None:
+        ident = threading.get_ident()
+        active.sampler.thread_ids.add(ident)
+        try:
+            yield
+        finally:
+            active.sampler.thread_ids.discard(ident)
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        active.thread_profiles.append(prof)
+
+
+def header_safe(value: str, limit: int = 4000) -> str:
+    """Strip characters that can't go into an HTTP header and cap length."""
+
+    cleaned = value.encode("latin-1", "replace").decode("latin-1")
+    cleaned = cleaned.replace("\r", " ").replace("\n", " ")
+    return cleaned[:limit]
@@ -0,0 +1 @@
+"""Offline benchmark suite for Kit (see docs/BENCHMARKS.md)."""
@@ -0,0 +1,145 @@
+"""Shared helpers for the benchmark scripts.
+
+Results are flat `{metric_name: number}` dicts. The metric suffix encodes the
+direction used by `compare.py`:
+- `_ms`, `_s`, `_bytes`: lower is better
+- `_per_s`: higher is better
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)."""
+
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_metrics(prefix: str, seconds: Iterable[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in seconds]
+    return {
+        f"{prefix}.p50_ms": round(percentile(ms, 50), 3),
+        f"{prefix}.p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError(f"nothing listening on 127.0.0.1:{port}")
+
+
+class UvicornThread:
+    """Run an ASGI app on a real socket in a background thread.
+
+    Shared state (`KIT_STATE_DB`) goes to a throwaway database so benchmark
+    traffic never lands in the developer's metrics or `popular` prewarm.
+    Every benchmark request comes from one client, so per-client rate limits
+    default to off (they would only measure the limiter); admission
+    watermarks stay on. Both are undone on exit.
+    """
+
+    def __init__(self, app: Any, port: Optional[int] = None) -> None:
+        import uvicorn
+
+        self.port = port or free_port()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, name="bench-uvicorn", daemon=True)
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self._saved_env: Dict[str, Optional[str]] = {}
+
+    def _set_env(self, name: str, value: str) -> None:
+        self._saved_env.setdefault(name, os.environ.get(name))
+        os.environ[name] = value
+
+    def __enter__(self) -> "UvicornThread":
+        from app.state import reset_state
+
+        self._tmp = tempfile.TemporaryDirectory(prefix="kit-bench-state-")
+        self._set_env("KIT_STATE_DB", str(Path(self._tmp.name) / "kit_state.sqlite"))
+        for route in ("PROXY", "MODULES"):
+            if f"KIT_RATE_{route}_PER_S" not in os.environ:
+                self._set_env(f"KIT_RATE_{route}_PER_S", "0")
+        reset_state()
+        self.thread.start()
+        wait_for_port(self.port)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        from app.state import reset_state
+
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+        reset_state()
+        for name, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self._saved_env.clear()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def result_doc(metrics: Dict[str, float], params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "metrics": dict(sorted(metrics.items())),
+    }
+
+
+def write_doc(doc: Dict[str, Any], out: Optional[Path]) -> None:
+    text = json.dumps(doc, indent=2)
+    if out is not None:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(text + "\n")
+    print(text)
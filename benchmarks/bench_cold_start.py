@@ -0,0 +1,104 @@
+"""Cold-start benchmark for tool discovery.
+
+Each scenario runs in a fresh interpreter so module caches don't leak between
+measurements. The registry (and so FastAPI) is imported before the clock
+starts in every scenario:
+
+- eager: import every tool module (what discovery used to do)
+- manifest_cold: `discover_tools()` with an empty manifest cache
+- manifest_warm: `discover_tools()` with the on-disk manifest cache populated
+- first_run: lazily import each tool's runner after a warm discovery
+
+Usage:
+  python benchmarks/bench_cold_start.py [--repeat 5] [--out results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks._common import result_doc, write_doc
+
+SCENARIOS: Dict[str, str] = {
+    "eager": """
+import importlib, time
+from pathlib import Path
+import app.modules.registry  # same framework import baseline as the other scenarios
+t0 = time.perf_counter()
+for p in sorted(Path("app/modules").glob("*.py")):
+    if not p.stem.startswith("_") and p.stem not in {"registry", "contract"}:
+        importlib.import_module(f"app.modules.{p.stem}")
+print(time.perf_counter() - t0)
+""",
+    "manifest": """
+import time
+from app.modules.registry import discover_tools
+t0 = time.perf_counter()
+discover_tools()
+print(time.perf_counter() - t0)
+""",
+    "first_run": """
+import time
+from app.modules.registry import discover_tools, get_runner
+ids = [t.id for t in discover_tools()]
+t0 = time.perf_counter()
+for i in ids:
+    get_runner(i)
+print(time.perf_counter() - t0)
+""",
+}
+
+
+def _run(code: str, env: Dict[str, str]) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(repeat: int = 5) -> Dict[str, float]:
+    results: Dict[str, List[float]] = {"eager": [], "manifest_cold": [], "manifest_warm": [], "first_run": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(repeat):
+            env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), PYTHONDONTWRITEBYTECODE="0")
+            env["KIT_MANIFEST_CACHE"] = str(Path(tmp) / f"manifest-{i}.json")
+            results["eager"].append(_run(SCENARIOS["eager"], env))
+            results["manifest_cold"].append(_run(SCENARIOS["manifest"], env))
+            results["manifest_warm"].append(_run(SCENARIOS["manifest"], env))
+            results["first_run"].append(_run(SCENARIOS["first_run"], env))
+    metrics: Dict[str, float] = {}
+    for name, samples in results.items():
+        ms = sorted(x * 1000 for x in samples)
+        metrics[f"cold_start.{name}.median_ms"] = round(statistics.median(ms), 3)
+        metrics[f"cold_start.{name}.min_ms"] = round(ms[0], 3)
+    return metrics
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    write_doc(result_doc(run_benchmark(args.repeat), {"repeat": args.repeat}), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+"""fs_triage benchmark: scan rate on synthetic trees.
+
+Trees are made of sparse files (sizes and mtimes vary, almost no disk used),
+1000 files per directory. Trees are cached under `--tree-root` and reused
+between runs when the file count matches.
+
+Usage:
+  python benchmarks/bench_fs_triage.py [--files 10000 100000] [--tree-root /tmp/kit-bench-trees] [--out fs.json]
+  python benchmarks/bench_fs_triage.py --files 1000000   # slow to build the first time
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks._common import result_doc, write_doc
+
+DEFAULT_FILE_COUNTS = [10_000, 100_000]
+FILES_PER_DIR = 1000
+DEFAULT_TREE_ROOT = Path(tempfile.gettempdir()) / "kit-bench-trees"
+
+
+def build_tree(root: Path, files: int) -> Path:
+    tree = root / f"tree_{files}"
+    marker = tree / ".complete"
+    if marker.exists():
+        return tree
+
+    now = time.time()
+    for i in range(files):
+        d = tree / f"d{i // FILES_PER_DIR:05d}"
+        if i % FILES_PER_DIR == 0:
+            d.mkdir(parents=True, exist_ok=True)
+        p = d / f"f{i:07d}.bin"
+        with open(p, "wb") as f:
+            f.truncate((i * 7919) % (8 * 1024 * 1024))
+        age = (i * 104729) % (3 * 365 * 86400)
+        os.utime(p, (now - age, now - age))
+    marker.touch()
+    return tree
+
+
+def run_benchmark(
+    *,
+    file_counts: List[int] = DEFAULT_FILE_COUNTS,
+    tree_root: Path = DEFAULT_TREE_ROOT,
+    repeat: int = 3,
+    top_n: int = 20,
+) -> Dict[str, float]:
+    from app.modules import fs_triage
+
+    max_files_cap = int(fs_triage.TOOL_DEFINITION["input_schema"]["properties"]["max_files"]["maximum"])
+    metrics: Dict[str, float] = {}
+    for files in file_counts:
+        tree = build_tree(tree_root, files)
+        seconds: List[float] = []
+        scanned = 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = fs_triage.run({"path": str(tree), "top_n": top_n, "max_files": min(files, max_files_cap)})
+            seconds.append(time.perf_counter() - t0)
+            if out.get("status") != "success":
+                raise RuntimeError(f"fs_triage failed on {tree}: {out.get('detail')}")
+            scanned = int(out["scanned_files"])
+        best = statistics.median(seconds)
+        metrics[f"fs_triage.files_{files}.scan_s"] = round(best, 4)
+        metrics[f"fs_triage.files_{files}.files_per_s"] = round(scanned / best, 1)
+        metrics[f"fs_triage.files_{files}.scanned"] = scanned
+    return metrics
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="fs_triage scan-rate benchmark.")
+    parser.add_argument("--files", type=int, nargs="*", default=DEFAULT_FILE_COUNTS)
+    parser.add_argument("--tree-root", type=Path, default=DEFAULT_TREE_ROOT)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    metrics = run_benchmark(file_counts=args.files, tree_root=args.tree_root, repeat=args.repeat)
+    write_doc(result_doc(metrics, {"files": args.files, "repeat": args.repeat}), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""Proxy benchmark: throughput, p50/p99 latency and time-to-first-byte.
+
+Starts the local Open WebUI stand-in and the Kit app (uvicorn, real sockets),
+then drives `/proxy/...` with a pool of keep-alive client threads:
+- fixed-size JSON bodies (1 KiB, 64 KiB, 1 MiB by default)
+- SSE token streams at a controlled rate
+
+Usage:
+  python benchmarks/bench_proxy.py [--requests 200] [--concurrency 8] [--out proxy.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks._common import UvicornThread, latency_metrics, result_doc, write_doc
+from benchmarks.stub_openwebui import StubOpenWebUI
+
+DEFAULT_SIZES = [1024, 64 * 1024, 1024 * 1024]
+
+
+def _fetch(conn: http.client.HTTPConnection, path: str) -> Tuple[float, float, int]:
+    """Return (ttfb_s, total_s, body_bytes) for one GET."""
+
+    t0 = time.perf_counter()
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    first = resp.read(1)
+    ttfb = time.perf_counter() - t0
+    rest = resp.read()
+    total = time.perf_counter() - t0
+    if resp.status != 200:
+        raise RuntimeError(f"{path}: HTTP {resp.status}")
+    return ttfb, total, len(first) + len(rest)
+
+
+def drive(port: int, path: str, requests: int, concurrency: int) -> Dict[str, object]:
+    lock = threading.Lock()
+    samples: List[Tuple[float, float, int]] = []
+    remaining = [requests]
+
+    def worker() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        try:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                sample = _fetch(conn, path)
+                with lock:
+                    samples.append(sample)
+        finally:
+            conn.close()
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    return {
+        "ttfb": [s[0] for s in samples],
+        "total": [s[1] for s in samples],
+        "bytes": sum(s[2] for s in samples),
+        "wall": wall,
+        "count": len(samples),
+    }
+
+
+def _metrics(prefix: str, run: Dict[str, object]) -> Dict[str, float]:
+    out = latency_metrics(prefix, run["total"])  # type: ignore[arg-type]
+    ttfb = latency_metrics(f"{prefix}.ttfb", run["ttfb"])  # type: ignore[arg-type]
+    out.update(ttfb)
+    wall = float(run["wall"])  # type: ignore[arg-type]
+    out[f"{prefix}.req_per_s"] = round(int(run["count"]) / wall, 2)  # type: ignore[arg-type]
+    out[f"{prefix}.mb_per_s"] = round(int(run["bytes"]) / wall / (1024 * 1024), 2)  # type: ignore[arg-type]
+    return out
+
+
+def run_benchmark(
+    *,
+    requests: int = 200,
+    concurrency: int = 8,
+    sizes: List[int] = DEFAULT_SIZES,
+    sse_streams: int = 20,
+    sse_tokens: int = 50,
+    sse_interval_ms: float = 10,
+) -> Dict[str, float]:
+    metrics: Dict[str, float] = {}
+    with StubOpenWebUI() as stub:
+        os.environ["OPENWEBUI_BASE_URL"] = stub.base_url
+        from app.main import app
+
+        with UvicornThread(app) as server:
+            for size in sizes:
+                path = f"/bytes/{size}"
+                drive(server.port, f"/proxy{path}", min(20, requests), concurrency)  # warm-up
+                metrics.update(_metrics(f"proxy.bytes_{size}", drive(server.port, f"/proxy{path}", requests, concurrency)))
+                metrics.update(_metrics(f"direct.bytes_{size}", drive(stub.port, path, requests, concurrency)))
+
+            sse = f"/sse?tokens={sse_tokens}&interval_ms={sse_interval_ms}"
+            metrics.update(_metrics("proxy.sse", drive(server.port, f"/proxy{sse}", sse_streams, min(concurrency, 4))))
+            metrics.update(_metrics("direct.sse", drive(stub.port, sse, sse_streams, min(concurrency, 4))))
+    return metrics
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Kit proxy benchmark (offline).")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    metrics = run_benchmark(requests=args.requests, concurrency=args.concurrency, sizes=args.sizes)
+    write_doc(result_doc(metrics, vars(args) | {"out": str(args.out)}), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
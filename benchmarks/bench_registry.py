@@ -0,0 +1,176 @@
+"""Registry benchmark: `/modules/list` and `/modules/run` latency vs tool count.
+
+For each tool count a temporary modules directory is filled with synthetic,
+valid tools and the registry is pointed at it; requests go through the real
+app over HTTP (uvicorn). A `bench_large` tool returning an fs_triage-sized
+result measures serialization and response bytes with and without gzip.
+
+Usage:
+  python benchmarks/bench_registry.py [--tools 10 100 500] [--requests 200] [--out registry.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks._common import UvicornThread, latency_metrics, result_doc, write_doc
+
+DEFAULT_TOOL_COUNTS = [10, 100, 500]
+
+TOOL_TEMPLATE = '''TOOL_DEFINITION = {{
+    "id": "bench_{i}",
+    "name": "Bench Tool {i}",
+    "icon": "tool",
+    "description": "Synthetic benchmark tool {i}.",
+    "version": "0.1.0",
+    "ralph_loop": True,
+    "allow_network": "none",
+    "allow_filesystem": "none",
+    "input_schema": {{"type": "object", "properties": {{"n": {{"type": "integer"}}}}, "additionalProperties": False}},
+}}
+
+
+def run(payload: dict):
+    return {{"status": "success", "n": payload.get("n", 0)}}
+'''
+
+
+LARGE_TOOL = TOOL_TEMPLATE.format(i="large").replace(
+    '''    return {"status": "success", "n": payload.get("n", 0)}''',
+    '''    rows = [
+        {"path": f"/home/u/projects/p{i % 97}/src/file_{i}.py", "size_bytes": i * 37, "mtime": 1.7e9 + i}
+        for i in range(payload.get("n", 0))
+    ]
+    return {"status": "success", "largest": rows, "trace": [], "skipped": []}''',
+)
+LARGE_ROWS = 20000
+
+
+def make_tools(directory: Path, count: int) -> None:
+    for i in range(count):
+        (directory / f"bench_tool_{i}.py").write_text(TOOL_TEMPLATE.format(i=i))
+    (directory / "bench_large.py").write_text(LARGE_TOOL)
+
+
+def _time_requests(
+    port: int,
+    method: str,
+    path: str,
+    body: bytes,
+    requests: int,
+    extra_headers: Optional[Dict[str, str]] = None,
+    sizes: Optional[List[int]] = None,
+) -> List[float]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = {"content-type": "application/json"} if body else {}
+    headers.update(extra_headers or {})
+    out: List[float] = []
+    try:
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            conn.request(method, path, body=body or None, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+            out.append(time.perf_counter() - t0)
+            if sizes is not None:
+                sizes.append(len(data))
+            if resp.status != 200:
+                raise RuntimeError(f"{method} {path}: HTTP {resp.status}")
+    finally:
+        conn.close()
+    return out
+
+
+def _large_result_metrics(port: int, requests: int) -> Dict[str, float]:
+    body = json.dumps({"n": LARGE_ROWS}).encode()
+    metrics: Dict[str, float] = {}
+    for label, headers in (("identity", {"accept-encoding": "identity"}), ("gzip", {"accept-encoding": "gzip"})):
+        sizes: List[int] = []
+        times = _time_requests(port, "POST", "/modules/run/bench_large", body, requests, headers, sizes)
+        metrics.update(latency_metrics(f"registry.large_result.{label}", times))
+        metrics[f"registry.large_result.{label}_bytes"] = sizes[-1]
+    return metrics
+
+
+def run_benchmark(*, tool_counts: List[int] = DEFAULT_TOOL_COUNTS, requests: int = 200) -> Dict[str, float]:
+    import app.modules
+    from app.modules import registry
+
+    metrics: Dict[str, float] = {}
+    original_dir = registry.MODULES_DIR
+    original_cache = os.environ.get("KIT_MANIFEST_CACHE")
+    try:
+        for count in tool_counts:
+            with tempfile.TemporaryDirectory(prefix=f"kit-bench-{count}-") as tmp:
+                tools_dir = Path(tmp) / "tools"
+                tools_dir.mkdir()
+                make_tools(tools_dir, count)
+                registry.MODULES_DIR = tools_dir
+                os.environ["KIT_MANIFEST_CACHE"] = str(Path(tmp) / "manifest.json")
+                registry._DISK_CACHE = None  # noqa: SLF001
+                registry._MANIFEST.clear()  # noqa: SLF001
+                app.modules.__path__.append(str(tools_dir))
+
+                from app.main import app as kit_app
+
+                with UvicornThread(kit_app) as server:
+                    body = json.dumps({"n": 1}).encode()
+                    first = _time_requests(server.port, "POST", "/modules/run/bench_0", body, 1)
+                    metrics[f"registry.tools_{count}.run_first_ms"] = round(first[0] * 1000, 3)
+                    metrics.update(
+                        latency_metrics(
+                            f"registry.tools_{count}.list",
+                            _time_requests(server.port, "GET", "/modules/list", b"", requests),
+                        )
+                    )
+                    metrics.update(
+                        latency_metrics(
+                            f"registry.tools_{count}.run",
+                            _time_requests(server.port, "POST", "/modules/run/bench_0", body, requests),
+                        )
+                    )
+                    if count == tool_counts[0]:
+                        metrics.update(_large_result_metrics(server.port, max(5, requests // 10)))
+
+                app.modules.__path__.remove(str(tools_dir))
+                for name in [m for m in sys.modules if m.startswith("app.modules.bench_tool_")]:
+                    del sys.modules[name]
+    finally:
+        registry.MODULES_DIR = original_dir
+        if original_cache is None:
+            os.environ.pop("KIT_MANIFEST_CACHE", None)
+        else:
+            os.environ["KIT_MANIFEST_CACHE"] = original_cache
+        registry._DISK_CACHE = None  # noqa: SLF001
+        registry._MANIFEST.clear()  # noqa: SLF001
+        registry.RUNNERS.clear()
+        registry._LOADED.clear()  # noqa: SLF001
+    return metrics
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Kit registry benchmark (offline).")
+    parser.add_argument("--tools", type=int, nargs="*", default=DEFAULT_TOOL_COUNTS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    metrics = run_benchmark(tool_counts=args.tools, requests=args.requests)
+    write_doc(result_doc(metrics, {"tools": args.tools, "requests": args.requests}), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+"""Compare two benchmark result files and flag regressions.
+
+A metric regresses when it moves in the bad direction by more than its
+threshold (percent). Direction comes from the metric suffix (see
+`_common.py`); metrics without a known suffix are informational only.
+
+Exit codes:
+- 0: no regressions
+- 1: one or more regressions
+
+Usage:
+  python benchmarks/compare.py baseline.json current.json [--threshold 10]
+      [--metric-threshold 'proxy.*.p99_ms=25' ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LOWER_IS_BETTER = ("_ms", "_s", "_bytes")
+HIGHER_IS_BETTER = ("_per_s",)
+
+
+@dataclass(frozen=True)
+class Delta:
+    metric: str
+    baseline: float
+    current: float
+    change_pct: float
+    threshold_pct: float
+    regression: bool
+
+
+def direction(metric: str) -> Optional[str]:
+    # Check the longer suffix first: "_per_s" also ends in "_s".
+    if metric.endswith(HIGHER_IS_BETTER):
+        return "higher"
+    if metric.endswith(LOWER_IS_BETTER):
+        return "lower"
+    return None
+
+
+def _threshold_for(metric: str, default: float, overrides: List[Tuple[str, float]]) -> float:
+    for pattern, value in overrides:
+        if fnmatch.fnmatchcase(metric, pattern):
+            return value
+    return default
+
+
+def compare(
+    baseline: Dict[str, float],
+    current: Dict[str, float],
+    *,
+    threshold_pct: float = 10.0,
+    overrides: Optional[List[Tuple[str, float]]] = None,
+) -> List[Delta]:
+    out: List[Delta] = []
+    for metric in sorted(set(baseline) & set(current)):
+        way = direction(metric)
+        if way is None:
+            continue
+        base, cur = float(baseline[metric]), float(current[metric])
+        if base == 0:
+            continue
+        change = (cur - base) / abs(base) * 100
+        limit = _threshold_for(metric, threshold_pct, overrides or [])
+        worse = change if way == "lower" else -change
+        out.append(Delta(metric, base, cur, round(change, 2), limit, worse > limit))
+    return out
+
+
+def _parse_override(text: str) -> Tuple[str, float]:
+    pattern, sep, value = text.rpartition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected PATTERN=PCT, got {text!r}")
+    return pattern, float(value)
+
+
+def _metrics(path: Path) -> Dict[str, float]:
+    doc = json.loads(path.read_text())
+    return dict(doc.get("metrics") or {})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two Kit benchmark result files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="default allowed regression, percent")
+    parser.add_argument(
+        "--metric-threshold",
+        type=_parse_override,
+        action="append",
+        default=[],
+        help="per-metric override, glob=percent (first match wins)",
+    )
+    args = parser.parse_args(argv)
+
+    deltas = compare(
+        _metrics(args.baseline),
+        _metrics(args.current),
+        threshold_pct=args.threshold,
+        overrides=args.metric_threshold,
+    )
+    for d in deltas:
+        flag = "REGRESSION" if d.regression else "ok"
+        print(f"{flag:>10}  {d.metric}: {d.baseline:g} -> {d.current:g} ({d.change_pct:+.1f}%, limit {d.threshold_pct:g}%)")
+
+    regressions = [d for d in deltas if d.regression]
+    print(f"{len(deltas)} metrics compared, {len(regressions)} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
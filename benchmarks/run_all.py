@@ -0,0 +1,60 @@
+"""Run the whole benchmark suite and write one result file.
+
+Usage:
+  python benchmarks/run_all.py --out results/current.json
+  python benchmarks/run_all.py --only proxy registry --quick
+  python benchmarks/compare.py results/baseline.json results/current.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks import bench_cold_start, bench_fs_triage, bench_proxy, bench_registry
+from benchmarks._common import result_doc, write_doc
+
+SUITES = ["cold_start", "proxy", "registry", "fs_triage"]
+
+
+def _suites(quick: bool) -> Dict[str, Callable[[], Dict[str, float]]]:
+    if quick:
+        return {
+            "cold_start": lambda: bench_cold_start.run_benchmark(repeat=2),
+            "proxy": lambda: bench_proxy.run_benchmark(requests=50, sse_streams=8),
+            "registry": lambda: bench_registry.run_benchmark(tool_counts=[10, 100], requests=50),
+            "fs_triage": lambda: bench_fs_triage.run_benchmark(file_counts=[10_000], repeat=2),
+        }
+    return {
+        "cold_start": bench_cold_start.run_benchmark,
+        "proxy": bench_proxy.run_benchmark,
+        "registry": bench_registry.run_benchmark,
+        "fs_triage": bench_fs_triage.run_benchmark,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the Kit benchmark suite (offline).")
+    parser.add_argument("--only", nargs="*", choices=SUITES, default=SUITES)
+    parser.add_argument("--quick", action="store_true", help="smaller workloads for a fast smoke run")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    suites = _suites(args.quick)
+    metrics: Dict[str, float] = {}
+    for name in args.only:
+        print(f"running {name}...", file=sys.stderr)
+        metrics.update(suites[name]())
+
+    write_doc(result_doc(metrics, {"suites": args.only, "quick": args.quick}), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
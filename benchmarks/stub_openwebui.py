@@ -0,0 +1,127 @@
+"""Local stand-in for Open WebUI used by the proxy benchmark.
+
+Endpoints (all deterministic, no network):
+- `GET|POST /bytes/<n>`: a JSON body of exactly n bytes
+- `GET|POST /sse?tokens=N&interval_ms=M&token_bytes=B`: an OpenAI-style SSE
+  stream of N chunks, one every M milliseconds, then `data: [DONE]`
+
+Run standalone with `python benchmarks/stub_openwebui.py --port 3999`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def fixed_body(n: int) -> bytes:
+    """A valid JSON document of exactly n bytes (n >= 16)."""
+
+    head = b'{"content":"'
+    tail = b'"}'
+    return head + b"x" * max(0, n - len(head) - len(tail)) + tail
+
+
+def sse_chunk(i: int, token_bytes: int) -> bytes:
+    payload = {"id": "bench", "choices": [{"index": 0, "delta": {"content": "t" * token_bytes}}], "n": i}
+    return b"data: " + json.dumps(payload).encode() + b"\n\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Small SSE writes must not wait on Nagle/delayed-ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _drain(self) -> None:
+        n = int(self.headers.get("content-length") or 0)
+        if n:
+            self.rfile.read(n)
+
+    def _handle(self) -> None:
+        self._drain()
+        url = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path.startswith("/bytes/"):
+            body = fixed_body(int(url.path.rsplit("/", 1)[-1]))
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if url.path == "/sse":
+            tokens = int(q.get("tokens", 50))
+            interval = float(q.get("interval_ms", 10)) / 1000
+            token_bytes = int(q.get("token_bytes", 4))
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("transfer-encoding", "chunked")
+            self.end_headers()
+            for i in range(tokens):
+                self._write_chunk(sse_chunk(i, token_bytes))
+                if interval:
+                    time.sleep(interval)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        self.send_response(404)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog (5) drops connects under load and adds 1s retries.
+    request_queue_size = 256
+
+
+class StubOpenWebUI:
+    def __init__(self, port: int = 0) -> None:
+        self.httpd = _Server(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.port = int(self.httpd.server_address[1])
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "StubOpenWebUI":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="bench-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local Open WebUI stand-in for benchmarks.")
+    parser.add_argument("--port", type=int, default=3999)
+    args = parser.parse_args()
+    stub = StubOpenWebUI(args.port)
+    print(f"stub Open WebUI on {stub.base_url}")
+    stub.httpd.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
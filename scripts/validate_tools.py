@@ -2,41 +2,101 @@
 
 This is an offline safety/quality check. It does NOT execute tool logic.
 
+By default validation is static: each file is parsed with `ast`, its
+`TOOL_DEFINITION` literal-evaluated and checked for a `run` function, so no
+module top-level code runs. Large trees are validated across a process pool
+and results are cached by file hash (the cache is invalidated when the
+contract rules change).
+
+`--import` additionally imports each module (the previous behaviour), which
+also catches import-time failures such as missing dependencies.
+
 Exit codes:
 - 0: all tools OK
 - 2: one or more tools invalid
 
 Usage:
   python scripts/validate_tools.py
+  python scripts/validate_tools.py --import
+  python scripts/validate_tools.py path/to/tools_dir other_tool.py
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import importlib
-import pkgutil
+import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from app.modules.contract import format_issues, validate_tool_definition
+from app.modules import contract
+from app.modules.contract import format_issues, validate_module_source, validate_tool_definition
 
+MODULES_DIR = REPO_ROOT / "app" / "modules"
+NON_TOOL_MODULES = {"registry", "contract"}
+DEFAULT_CACHE = REPO_ROOT / ".cache" / "validate_tools.json"
 
-def iter_module_names() -> List[str]:
-    pkg = importlib.import_module("app.modules")
-    out: List[str] = []
-    for modinfo in pkgutil.iter_modules(pkg.__path__):
-        name = modinfo.name
-        if name.startswith("_") or name in {"registry", "contract"}:
-            continue
-        out.append(f"app.modules.{name}")
+# Below this many files a process pool costs more than it saves.
+PARALLEL_THRESHOLD = 32
+
+
+def _is_tool_file(p: Path) -> bool:
+    return p.suffix == ".py" and not p.stem.startswith("_") and p.stem not in NON_TOOL_MODULES
+
+
+def iter_tool_files(paths: Optional[List[Path]] = None) -> List[Path]:
+    out: List[Path] = []
+    for p in paths or [MODULES_DIR]:
+        if p.is_dir():
+            out.extend(sorted(f for f in p.iterdir() if f.is_file() and _is_tool_file(f)))
+        elif p.is_file():
+            out.append(p)
     return out
 
 
+def display_name(p: Path) -> str:
+    try:
+        rel = p.resolve().relative_to(REPO_ROOT)
+    except ValueError:
+        return str(p)
+    return ".".join(rel.with_suffix("").parts)
+
+
+def iter_module_names() -> List[str]:
+    return [display_name(p) for p in iter_tool_files()]
+
+
+def _rules_digest() -> str:
+    # Cached verdicts are only valid for the contract rules that produced them.
+    return hashlib.sha256(Path(contract.__file__).read_bytes()).hexdigest()[:16]
+
+
+def validate_source(data: bytes, filename: str) -> Tuple[bool, List[str]]:
+    try:
+        source = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return False, [f"ERROR: not valid UTF-8: {e}"]
+    result = validate_module_source(source, filename)
+    return result.ok, [format_issues(result.issues)] if result.issues else []
+
+
+def _validate_file(path: str) -> Tuple[str, bool, List[str]]:
+    data = Path(path).read_bytes()
+    ok, issues = validate_source(data, path)
+    return hashlib.sha256(data).hexdigest(), ok, issues
+
+
 def validate_module(full_name: str) -> Tuple[bool, List[str]]:
+    """Import-based check (runs the module's top-level code)."""
+
     issues: List[str] = []
 
     try:
@@ -57,21 +117,114 @@ def validate_module(full_name: str) -> Tuple[bool, List[str]]:
     return ok, issues
 
 
-def main() -> int:
-    module_names = iter_module_names()
-    if not module_names:
+def _load_cache(path: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        doc = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if doc.get("rules") != _rules_digest():
+        return {}
+    return dict(doc.get("entries") or {})
+
+
+def _save_cache(path: Path, entries: Dict[str, Dict[str, object]]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"rules": _rules_digest(), "entries": entries}))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _is_stale(digest: str, entry: Dict[str, object], hashed: Dict[str, str]) -> bool:
+    """True when the entry's file is gone or no longer has this content."""
+
+    path = entry.get("path")
+    if not isinstance(path, str):
+        return True
+    if path not in hashed:
+        try:
+            hashed[path] = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        except OSError:
+            return True
+    return hashed[path] != digest
+
+
+def validate_files_static(
+    files: List[Path],
+    *,
+    cache_path: Optional[Path] = DEFAULT_CACHE,
+    jobs: Optional[int] = None,
+) -> Dict[Path, Tuple[bool, List[str]]]:
+    cache = _load_cache(cache_path) if cache_path else {}
+    results: Dict[Path, Tuple[bool, List[str]]] = {}
+    todo: List[Path] = []
+    dirty = False
+    # path -> digest for every file hashed in this run
+    hashed: Dict[str, str] = {}
+
+    for f in files:
+        digest = hashlib.sha256(f.read_bytes()).hexdigest()
+        path = str(f.resolve())
+        hashed[path] = digest
+        hit = cache.get(digest)
+        if hit is not None:
+            results[f] = (bool(hit["ok"]), list(hit["issues"]))  # type: ignore[arg-type]
+            if hit.get("path") != path:
+                hit["path"] = path
+                dirty = True
+        else:
+            todo.append(f)
+
+    if len(todo) >= PARALLEL_THRESHOLD and (jobs is None or jobs > 1):
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            fresh = list(pool.map(_validate_file, [str(f) for f in todo], chunksize=16))
+    else:
+        fresh = [_validate_file(str(f)) for f in todo]
+
+    for f, (digest, ok, issues) in zip(todo, fresh):
+        results[f] = (ok, issues)
+        cache[digest] = {"ok": ok, "issues": issues, "path": str(f.resolve())}
+
+    stale = [digest for digest, entry in cache.items() if _is_stale(digest, entry, hashed)]
+    for digest in stale:
+        del cache[digest]
+
+    if cache_path and (todo or stale or dirty):
+        _save_cache(cache_path, cache)
+    return results
+
+
+def _print_result(name: str, ok: bool, issues: List[str]) -> None:
+    print(f"{'OK' if ok else 'FAIL'}: {name}")
+    for block in issues:
+        for line in block.splitlines():
+            print(f"  {line}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate Kit tool modules.")
+    parser.add_argument("paths", nargs="*", type=Path, help="tool files or directories (default: app/modules)")
+    parser.add_argument("--import", dest="import_mode", action="store_true", help="also import each module")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and don't write the result cache")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for static validation")
+    args = parser.parse_args(argv)
+
+    files = iter_tool_files(args.paths or None)
+    if not files:
         print("No tool modules found.")
         return 0
 
+    results = validate_files_static(files, cache_path=None if args.no_cache else DEFAULT_CACHE, jobs=args.jobs)
+
     any_bad = False
-    for full_name in module_names:
-        ok, issues = validate_module(full_name)
-        status = "OK" if ok else "FAIL"
-        print(f"{status}: {full_name}")
-        if issues:
-            for block in issues:
-                for line in block.splitlines():
-                    print(f"  {line}")
+    for f in files:
+        ok, issues = results[f]
+        name = display_name(f)
+        if args.import_mode and ok:
+            ok, issues = validate_module(name)
+        _print_result(name, ok, issues)
         if not ok:
             any_bad = True
 
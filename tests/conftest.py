@@ -1 +1,27 @@
 # Reserved for shared pytest fixtures.
+import socket
+
+import pytest
+
+from app import state
+from app.modules import registry
+
+
+@pytest.fixture(autouse=True)
+def _isolated_state(monkeypatch, tmp_path):
+    # Shared state (jobs, metrics) goes to a per-test database, and the tool
+    # manifest cache to a per-test file instead of the repo's .cache/.
+    monkeypatch.setenv("KIT_STATE_DB", str(tmp_path / "kit_state.sqlite"))
+    monkeypatch.setenv("KIT_MANIFEST_CACHE", str(tmp_path / "tool_manifest.json"))
+    monkeypatch.setattr(registry, "_DISK_CACHE", None)
+    state.reset_state()
+    yield
+    state.reset_state()
+
+
+@pytest.fixture
+def free_port():
+    # A port nothing listens on (bound, then released).
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
@@ -0,0 +1,18 @@
+from benchmarks.compare import compare, direction
+
+
+def test_direction_from_suffix():
+    assert direction("proxy.sse.p99_ms") == "lower"
+    assert direction("proxy.bytes_1024.req_per_s") == "higher"
+    assert direction("fs_triage.files_10000.scanned") is None
+
+
+def test_compare_flags_regressions_past_threshold():
+    base = {"a.p50_ms": 10.0, "b.req_per_s": 100.0, "c.p99_ms": 10.0}
+    cur = {"a.p50_ms": 10.5, "b.req_per_s": 80.0, "c.p99_ms": 13.0}
+
+    deltas = {d.metric: d for d in compare(base, cur, threshold_pct=10, overrides=[("c.*", 50)])}
+
+    assert deltas["a.p50_ms"].regression is False
+    assert deltas["b.req_per_s"].regression is True
+    assert deltas["c.p99_ms"].regression is False
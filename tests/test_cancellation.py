@@ -0,0 +1,45 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.cancellation import CancelToken, request_deadline, use_token
+from app.main import app
+from app.modules import fs_triage
+from app.modules.contract import validate_tool_definition
+
+
+def test_token_deadline_and_header_budget(monkeypatch):
+    monkeypatch.delenv("KIT_MAX_RUNTIME_S", raising=False)
+    token = CancelToken(deadline=time.monotonic() - 1)
+    assert token.cancelled and token.reason == "deadline_exceeded"
+
+    now = time.monotonic()
+    assert request_deadline({}) is None
+    assert request_deadline({"x-kit-deadline-ms": "500"}, max_runtime_s=60) - now < 1
+    assert 59 < request_deadline({}, max_runtime_s=60) - now < 61
+
+    monkeypatch.setenv("KIT_MAX_RUNTIME_S", "ten minutes")
+    assert request_deadline({"x-kit-deadline-ms": "soon"}) is None
+
+
+def test_fs_triage_stops_when_cancelled(tmp_path):
+    (tmp_path / "a.txt").write_text("x")
+    token = CancelToken()
+    token.cancel("client_disconnected")
+    with use_token(token):
+        result = fs_triage.run({"path": str(tmp_path)})
+    assert result["status"] == "cancelled"
+    assert result["reason"] == "client_disconnected"
+
+
+def test_run_tool_deadline_header_returns_504(tmp_path):
+    client = TestClient(app)
+    resp = client.post("/modules/run/fs", json={"path": str(tmp_path)}, headers={"X-Kit-Deadline-Ms": "0"})
+    assert resp.status_code == 504
+    assert resp.json()["result"]["status"] == "cancelled"
+    assert client.get("/metrics").json()["metrics"]["cancelled.tool.fs.deadline_exceeded"] == 1
+
+
+def test_contract_rejects_bad_max_runtime():
+    td = dict(fs_triage.TOOL_DEFINITION, max_runtime_s=0)
+    assert not validate_tool_definition(td).ok
@@ -0,0 +1,69 @@
+import json
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware, negotiate
+from app.serialization import dumps
+
+
+def test_negotiate_respects_q_values_and_server_order():
+    assert negotiate("gzip, br;q=0.5", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate("gzip, br, zstd", ["zstd", "br", "gzip"]) == "zstd"
+    assert negotiate("*;q=0.1, gzip;q=0", ["gzip"]) is None
+    assert negotiate("identity", ["gzip"]) is None
+
+
+def _client(min_bytes=100):
+    async def big(_request):
+        return PlainTextResponse("x" * 5000)
+
+    async def small(_request):
+        return PlainTextResponse("tiny")
+
+    async def stream(_request):
+        async def gen():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+
+        return StreamingResponse(gen(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/big", big), Route("/small", small), Route("/stream", stream)])
+    return TestClient(CompressionMiddleware(app, minimum_size=min_bytes))
+
+
+def test_threshold_and_streaming():
+    client = _client()
+    big = client.get("/big", headers={"accept-encoding": "gzip"})
+    assert big.headers["content-encoding"] == "gzip"
+    assert int(big.headers["content-length"]) < 5000
+    assert big.text == "x" * 5000
+
+    small = client.get("/small", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    with client.stream("GET", "/stream", headers={"accept-encoding": "gzip"}) as resp:
+        assert resp.headers["content-encoding"] == "gzip"
+        raw = b"".join(resp.iter_raw())
+    assert zlib.decompress(raw, 16 + zlib.MAX_WBITS) == b"data: 0\n\ndata: 1\n\ndata: 2\n\n"
+
+
+@dataclass
+class _Row:
+    path: Path
+    size: int
+
+
+def test_fast_serializer_matches_jsonable_encoder(monkeypatch):
+    from app import serialization
+
+    doc = {"rows": [_Row(Path("/a"), 1)], "tags": ("a", "b"), "n": 1.5, "s": "é"}
+    assert json.loads(dumps(doc)) == jsonable_encoder(doc)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(dumps(doc)) == jsonable_encoder(doc)
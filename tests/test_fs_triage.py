@@ -0,0 +1,96 @@
+import os
+import time
+
+from app.modules import fs_triage
+
+
+def _write(path, size, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_rankings_over_columns(tmp_path):
+    _write(tmp_path / "a.bin", 10, 1_000_000)
+    _write(tmp_path / "sub" / "b.bin", 300, 3_000_000)
+    _write(tmp_path / "sub" / "deeper" / "c.bin", 200, 2_000_000)
+    (tmp_path / "link.bin").symlink_to(tmp_path / "a.bin")
+
+    result = fs_triage.run({"path": str(tmp_path), "top_n": 3})
+
+    assert result["status"] == "success"
+    assert result["scanned_files"] == 4  # the symlinked file counts, as before
+    assert result["total_bytes"] == 520
+    assert [os.path.basename(x["path"]) for x in result["largest"]] == ["b.bin", "c.bin", "a.bin"]
+    assert result["largest"][0]["path"] == str(tmp_path / "sub" / "b.bin")
+    assert [x["mtime"] for x in result["oldest"]] == [1_000_000, 1_000_000, 2_000_000]
+
+
+def test_max_files_cap(tmp_path):
+    for i in range(5):
+        _write(tmp_path / f"f{i}.txt", i, 1_000_000 + i)
+
+    result = fs_triage.run({"path": str(tmp_path), "max_files": 3})
+
+    assert result["scanned_files"] == 3
+    assert any("Hit max_files=3" in s for s in result["skipped"])
+
+
+def test_filters_prune_and_match(tmp_path):
+    now = time.time()
+    old = now - 200 * 86400
+    _write(tmp_path / "app.log", 5000, old)
+    _write(tmp_path / "small.log", 10, old)
+    _write(tmp_path / "fresh.log", 5000, now)
+    _write(tmp_path / "data.bin", 9000, old)
+    _write(tmp_path / "logs" / "archive" / "deep.log", 6000, old)
+    _write(tmp_path / "node_modules" / "pkg" / "huge.log", 99999, old)
+
+    result = fs_triage.run(
+        {
+            "path": str(tmp_path),
+            "include": ["*.log"],
+            "exclude": ["node_modules"],
+            "min_size_bytes": 1000,
+            "older_than_days": 90,
+            "owners": [os.getuid()],
+        }
+    )
+
+    assert result["status"] == "success"
+    assert [os.path.basename(x["path"]) for x in result["largest"]] == ["deep.log", "app.log"]
+    assert result["pruned_dirs"] == 1
+    assert result["filtered_out"] == 3
+
+    by_path = fs_triage.run({"path": str(tmp_path), "exclude": ["logs/archive", "*.bin"]})
+    assert by_path["scanned_files"] == 4
+    assert by_path["pruned_dirs"] == 1
+
+
+def test_invalid_filter(tmp_path):
+    result = fs_triage.run({"path": str(tmp_path), "min_size_bytes": 10, "max_size_bytes": 5})
+    assert result["status"] == "error"
+    assert result["error"] == "invalid_filter"
+
+
+def test_numpy_top_n_matches_heapq(monkeypatch):
+    import random
+
+    import pytest
+
+    pytest.importorskip("numpy")
+    from app.modules import _fs_columns
+
+    rng = random.Random(7)
+    cols = _fs_columns.FileColumns()
+    d = cols.dir_id("/data")
+    for i in range(5000):
+        cols.append(d, f"f{i}", rng.randrange(50), rng.randrange(20) * 10**9)
+
+    picks = [(cols.sizes, True), (cols.mtimes_ns, False)]
+    with_numpy = [cols.top_indices(col, n, largest=lg) for col, lg in picks for n in (1, 7, 200, 5000, 9000)]
+    monkeypatch.setattr(_fs_columns, "np", None)
+    with_heapq = [cols.top_indices(col, n, largest=lg) for col, lg in picks for n in (1, 7, 200, 5000, 9000)]
+
+    assert with_numpy == with_heapq
+    assert cols.total_bytes() == sum(cols.sizes)
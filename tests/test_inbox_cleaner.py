@@ -0,0 +1,202 @@
+import os
+import time
+
+import pytest
+
+from app.modules import inbox_cleaner
+from app.modules._mailbox import iter_mbox, parse_headers
+
+OLD_DATE = "Mon, 01 Jan 2018 10:00:00 +0000"
+
+
+def _msg(sender, *, bulk=False, date=OLD_DATE, body="hello\n"):
+    lines = [f"From: Someone <{sender}>", f"Date: {date}", "Subject: hi"]
+    if bulk:
+        lines += ["List-Id: <news.example.com>", "List-Unsubscribe:", " <mailto:unsub@example.com>"]
+    return ("\n".join(lines) + "\n\n" + body).encode()
+
+
+@pytest.fixture(autouse=True)
+def _index_in_tmp(monkeypatch, tmp_path):
+    monkeypatch.setenv("KIT_INBOX_INDEX", str(tmp_path / "index.sqlite"))
+
+
+def _maildir(root, messages):
+    for sub in ("cur", "new", "tmp"):
+        (root / sub).mkdir(parents=True)
+    for i, raw in enumerate(messages):
+        (root / "cur" / f"{i}.host:2,S").write_bytes(raw)
+    return root
+
+
+def test_parse_headers_unfolds_and_ignores_body():
+    h = parse_headers(b"From: a@x\nList-Unsubscribe:\n <mailto:u@x>\n\nList-Id: not-a-header\n")
+    assert h["list-unsubscribe"] == "<mailto:u@x>"
+    assert "list-id" not in h
+
+
+def test_mbox_stream_finds_boundaries(tmp_path):
+    mbox = tmp_path / "box.mbox"
+    mbox.write_bytes(
+        b"From a@x Mon Jan  1 10:00:00 2018\n" + _msg("a@x", body=">From quoted\n")
+        + b"From b@x Mon Jan  1 10:00:00 2018\n" + _msg("b@x", bulk=True)
+    )
+    msgs = list(iter_mbox(mbox))
+    assert [m.sender for m in msgs] == ["a@x", "b@x"]
+    assert [m.bulk for m in msgs] == [False, True]
+    assert sum(m.size_bytes for m in msgs) == mbox.stat().st_size
+
+
+def test_dry_run_reports_without_changes(tmp_path):
+    root = _maildir(tmp_path / "Mail", [_msg("news@x", bulk=True), _msg("friend@x"), _msg("news@x", bulk=True)])
+    out = inbox_cleaner.run({"path": str(root)})
+
+    assert out["status"] == "success"
+    assert out["messages"] == 3
+    assert out["candidates"] == 2
+    assert out["top_senders"][0]["sender"] == "news@x"
+    assert len(os.listdir(root / "cur")) == 3
+
+
+def test_move_verifies_by_folder_listing_and_retries_failures(tmp_path):
+    recent = time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime())
+    root = _maildir(
+        tmp_path / "Mail",
+        [_msg("news@x", bulk=True), _msg("news@x", bulk=True, date=recent), _msg("news@x", bulk=True)],
+    )
+    dest = tmp_path / "Archive"
+    (dest / "cur").mkdir(parents=True)
+    (dest / "cur" / "2.host:2,S").write_bytes(b"already here")  # blocks the move of message 2
+
+    out = inbox_cleaner.run({"path": str(root), "dry_run": False, "move_to": str(dest)})
+
+    assert out["status"] == "failed"
+    assert out["actions"]["applied"] == 1
+    assert [f["key"] for f in out["actions"]["failures"]] == ["cur/2.host:2,S"]
+    assert sorted(os.listdir(dest / "cur")) == ["0.host:2,S", "2.host:2,S"]
+    assert sorted(os.listdir(root / "cur")) == ["1.host:2,S", "2.host:2,S"]
+
+    # Each round is verified with one listing per folder; after the first
+    # round only the unconfirmed message goes round again.
+    verifies = [t for t in out["trace"] if t["step"] == "verify"]
+    assert len(verifies) == inbox_cleaner.MAX_ATTEMPTS
+    assert verifies[0]["note"] == "confirmed 1/2 messages"
+    assert all(v["note"] == "confirmed 0/1 messages" for v in verifies[1:])
+    assert [b["messages"] for v in verifies[1:] for b in v["batches"]] == [1] * (len(verifies) - 1)
+
+
+def test_index_resync_only_parses_changes(tmp_path):
+    root = _maildir(tmp_path / "Mail", [_msg("news@x", bulk=True), _msg("friend@x")])
+    first = inbox_cleaner.run({"path": str(root)})
+    assert first["index"]["parsed"] == 2
+
+    (root / "cur" / "0.host:2,S").rename(root / "cur" / "0.host:2,RS")
+    (root / "cur" / "2.host:2,").write_bytes(_msg("news@x", bulk=True))
+    second = inbox_cleaner.run({"path": str(root)})
+
+    assert second["index"]["parsed"] == 1
+    assert second["index"]["updated"] == 1
+    assert second["messages"] == 3
+    assert second["candidates"] == 2
+    streamed = inbox_cleaner.run({"path": str(root), "use_index": False})
+    assert streamed["top_senders"] == second["top_senders"]
+
+
+def test_index_mbox_append_is_incremental(tmp_path):
+    mbox = tmp_path / "box.mbox"
+    sep = b"From x Mon Jan  1 10:00:00 2018\n"
+    mbox.write_bytes(sep + _msg("a@x") + sep + _msg("b@x", bulk=True))
+    assert inbox_cleaner.run({"path": str(mbox)})["index"]["parsed"] == 2
+
+    with mbox.open("ab") as f:
+        f.write(sep + _msg("c@x", bulk=True))
+    out = inbox_cleaner.run({"path": str(mbox)})
+
+    assert out["index"]["mode"] == "append"
+    assert out["index"]["parsed"] == 1
+    assert out["messages"] == 3
+    assert out["total_bytes"] == mbox.stat().st_size
+
+
+def test_batched_apply_retries_only_failed_subset(tmp_path):
+    root = _maildir(tmp_path / "Mail", [_msg("news@x", bulk=True) for _ in range(5)])
+    dest = tmp_path / "Archive"
+    (dest / "cur").mkdir(parents=True)
+    (dest / "cur" / "3.host:2,S").write_bytes(b"already here")
+
+    out = inbox_cleaner.run(
+        {"path": str(root), "dry_run": False, "move_to": str(dest), "batch_size": 2, "workers": 2}
+    )
+
+    assert out["status"] == "failed"
+    assert out["actions"]["applied"] == 4
+    assert [f["key"] for f in out["actions"]["failures"]] == ["cur/3.host:2,S"]
+    verifies = [t for t in out["trace"] if t["step"] == "verify"]
+    assert len(verifies) == 3
+    assert len(verifies[0]["batches"]) == 3
+    assert [b["messages"] for b in verifies[1]["batches"]] == [1]
+
+
+def test_locked_index_reports_busy(monkeypatch, tmp_path):
+    import sqlite3
+
+    from app.modules import _inbox_index
+
+    root = _maildir(tmp_path / "Mail", [_msg("news@x", bulk=True)])
+    index_path = tmp_path / "index.sqlite"
+    inbox_cleaner.run({"path": str(root)})  # create the index
+
+    monkeypatch.setattr(_inbox_index, "BUSY_TIMEOUT_S", 0.1)
+    other = sqlite3.connect(str(index_path))
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        result = inbox_cleaner.run({"path": str(root)})
+    finally:
+        other.rollback()
+        other.close()
+
+    assert result["status"] == "error"
+    assert result["error"] == "index_busy"
+
+
+def test_indexed_sync_stops_when_cancelled(monkeypatch, tmp_path):
+    import sqlite3
+
+    from app.cancellation import CancelToken, use_token
+    from app.modules import _inbox_index
+
+    monkeypatch.setattr(_inbox_index, "BATCH", 2)
+    root = _maildir(tmp_path / "Mail", [_msg(f"s{i}@x") for i in range(10)])
+
+    token = CancelToken()
+    token.cancel("client_disconnected")
+    with use_token(token):
+        result = inbox_cleaner.run({"path": str(root)})
+
+    assert result["status"] == "cancelled"
+    assert result["reason"] == "client_disconnected"
+    db = sqlite3.connect(str(tmp_path / "index.sqlite"))
+    assert db.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
+    db.close()
+
+    assert inbox_cleaner.run({"path": str(root)})["index"]["parsed"] == 10
+
+
+def test_forget_deletes_by_uid_quickly(tmp_path):
+    from app.modules._inbox_index import HeaderIndex
+
+    with HeaderIndex(tmp_path / "big.sqlite") as index:
+        mid = index.mailbox_id(tmp_path / "Mail", "maildir")
+        index.db.executemany(
+            "INSERT INTO messages (mailbox_id, uid, key, sender, list_id, date, size, flags, bulk, list_unsub) "
+            "VALUES (?, ?, ?, 's@x', '', 0, 1, 'S', 1, 0)",
+            ((mid, f"{i}.host", f"cur/{i}.host:2,S") for i in range(50_000)),
+        )
+        index.db.commit()
+
+        t0 = time.perf_counter()
+        index.forget(mid, (f"cur/{i}.host:2,S" for i in range(0, 50_000, 20)))
+        elapsed = time.perf_counter() - t0
+
+        assert index.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 47_500
+    assert elapsed < 1.0
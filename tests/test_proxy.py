@@ -0,0 +1,10 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_proxy_unreachable_engine_returns_502(monkeypatch, free_port):
+    monkeypatch.setenv("OPENWEBUI_BASE_URL", f"http://127.0.0.1:{free_port}")
+    resp = TestClient(app).get("/proxy/api/models")
+    assert resp.status_code == 502
+    assert resp.json()["error"] == "Gee Whiz! Something went wrong!"
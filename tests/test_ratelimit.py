@@ -0,0 +1,53 @@
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.ratelimit import AdmissionMiddleware, Limits, TokenBuckets
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    buckets = TokenBuckets(rate=2, burst=2, clock=lambda: now[0])
+    assert buckets.acquire("a") == 0 and buckets.acquire("a") == 0
+    assert buckets.acquire("a") == 0.5
+    assert buckets.acquire("b") == 0  # other clients are unaffected
+    now[0] = 0.5
+    assert buckets.acquire("a") == 0
+
+
+def _client(limits):
+    async def run(_request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/modules/run/{tool}", run, methods=["POST"]), Route("/", run)])
+    mw = AdmissionMiddleware(app, limits=limits)
+    return mw, TestClient(mw)
+
+
+def test_rate_limit_and_admission_control():
+    mw, client = _client({"modules": Limits(rate=0.5, burst=2, max_inflight=4)})
+
+    codes = [client.post("/modules/run/fs").status_code for _ in range(3)]
+    assert codes == [200, 200, 429]
+    assert client.post("/modules/run/fs").headers["retry-after"] == "2"
+    # Rotating unvalidated auth headers doesn't buy a fresh bucket.
+    for token in ("x", "y", "z"):
+        assert client.post("/modules/run/fs", headers={"authorization": f"Bearer {token}"}).status_code == 429
+    # Other routes aren't limited.
+    assert all(client.get("/").status_code == 200 for _ in range(5))
+
+    mw.inflight["modules"] = 4
+    resp = client.post("/modules/run/fs", headers={"authorization": "Bearer y"})
+    assert resp.status_code == 503 and resp.headers["retry-after"] == "1"
+
+
+def test_malformed_limits_fall_back_to_defaults(monkeypatch, caplog):
+    monkeypatch.setenv("KIT_RATE_MODULES_PER_S", "fast")
+    monkeypatch.setenv("KIT_MAX_INFLIGHT_MODULES", "8.5")
+    monkeypatch.setenv("KIT_RATE_MODULES_BURST", "3")
+
+    lim = Limits.from_env("MODULES", rate=5, burst=10, max_inflight=8)
+
+    assert lim == Limits(rate=5, burst=3.0, max_inflight=8)
+    assert "KIT_RATE_MODULES_PER_S" in caplog.text
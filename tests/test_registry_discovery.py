@@ -4,3 +4,88 @@ from app.modules.registry import discover_tools
 def test_discover_tools_includes_inbox():
     tools = {t.id for t in discover_tools()}
     assert "inbox" in tools
+
+
+def test_discovery_is_import_free_and_runner_is_lazy(monkeypatch):
+    import sys
+
+    from app.modules import registry
+
+    monkeypatch.delitem(sys.modules, "app.modules.system_health", raising=False)
+    monkeypatch.delitem(registry.RUNNERS, "health", raising=False)
+    monkeypatch.delitem(registry._LOADED, "app.modules.system_health", raising=False)
+
+    assert "health" in {t.id for t in registry.discover_tools()}
+    assert "app.modules.system_health" not in sys.modules
+
+    assert callable(registry.get_runner("health"))
+    assert "app.modules.system_health" in sys.modules
+
+
+def test_discovery_skips_modules_with_side_effects(monkeypatch, tmp_path):
+    from app.modules import registry
+
+    (tmp_path / "boom.py").write_text(
+        "raise SystemExit('imported!')\n"
+        "TOOL_DEFINITION = {'id': 'boom', 'name': 'Boom', 'description': 'd', 'version': '0.1.0',\n"
+        "    'ralph_loop': True, 'allow_network': 'none', 'allow_filesystem': 'none',\n"
+        "    'input_schema': {'type': 'object', 'properties': {}}}\n"
+        "def run(payload):\n    return payload\n"
+    )
+    monkeypatch.setattr(registry, "MODULES_DIR", tmp_path)
+
+    assert [t.id for t in registry.discover_tools()] == ["boom"]
+
+
+def test_slow_first_import_does_not_block_event_loop(monkeypatch):
+    import asyncio
+    import threading
+    import time
+
+    import httpx
+
+    from app.main import app
+    from app.modules import registry
+
+    real_get_runner = registry.get_runner
+    seen = {}
+
+    def slow_get_runner(tool_id):
+        seen["thread"] = threading.current_thread()
+        time.sleep(0.5)  # stands in for a heavy tool import
+        return real_get_runner(tool_id)
+
+    monkeypatch.setattr(registry, "get_runner", slow_get_runner)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.ensure_future(ticker())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kit") as client:
+            resp = await client.post("/modules/run/health", json={})
+        tick_task.cancel()
+        return resp, ticks
+
+    resp, ticks = asyncio.run(scenario())
+    assert resp.status_code == 200
+    assert seen["thread"] is not threading.main_thread()
+    assert ticks > 10
+
+
+def test_bad_prewarm_top_falls_back(monkeypatch):
+    from app.modules import registry
+
+    from app.state import get_state
+
+    registry.discover_tools()
+    for tool_id, runs in (("fs", 4), ("health", 3), ("inbox", 2), ("sample", 1)):
+        get_state().incr(f"tool.runs.{tool_id}", runs)
+    monkeypatch.setenv("KIT_PREWARM_TOP", "three")
+    assert registry._prewarm_ids("popular") == ["fs", "health", "inbox"]  # default top 3
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.state import SharedState
+
+
+def test_state_is_shared_between_instances(tmp_path):
+    # Two instances on one file stand in for two worker processes.
+    a = SharedState(tmp_path / "s.sqlite", flush_interval=0)
+    b = SharedState(tmp_path / "s.sqlite", flush_interval=0)
+
+    a.incr("tool.runs.x", 2)
+    b.incr("tool.runs.x")
+    job = a.create_job("x")
+    a.update_job(job, "success", result={"ok": True})
+    a.flush()
+    assert b.metrics("tool.runs.") == {"tool.runs.x": 3}
+    assert b.get_job(job)["result"] == {"ok": True}
+
+
+def test_finished_jobs_expire(tmp_path, monkeypatch):
+    monkeypatch.setenv("KIT_JOB_TTL_S", "60")
+    state = SharedState(tmp_path / "s.sqlite", flush_interval=0)
+    old, queued, fresh = state.create_job("x"), state.create_job("x"), state.create_job("x")
+    state.update_job(old, "success", result={"ok": True})
+    state.update_job(fresh, "success")
+    state._conn().execute("UPDATE jobs SET updated_at = ? WHERE id IN (?, ?)", (time.time() - 120, old, queued))
+
+    assert state.prune_jobs() == 1
+    assert state.get_job(old) is None
+    assert state.get_job(queued)["status"] == "queued"  # unfinished jobs are kept
+    assert state.get_job(fresh)["status"] == "success"
+    state.close()
+
+
+def test_close_closes_every_thread_connection(tmp_path):
+    state = SharedState(tmp_path / "s.sqlite", flush_interval=0)
+    conns = [state._conn()]
+    t = threading.Thread(target=lambda: conns.append(state._conn()))
+    t.start()
+    t.join()
+
+    state.close()
+
+    for db in conns:
+        try:
+            db.execute("SELECT 1")
+        except Exception as exc:  # noqa: BLE001
+            assert "closed" in str(exc)
+        else:
+            raise AssertionError("connection left open")
+
+
+def test_job_api_round_trip():
+    client = TestClient(app)
+    resp = client.post("/modules/jobs/health", json={})
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+
+    # TestClient runs background tasks before returning the response.
+    job = client.get(f"/modules/jobs/{job_id}").json()
+    assert job["status"] == "success"
+    assert job["result"]["status"] in {"success", "failed", "error"}
+    assert client.get("/metrics").json()["metrics"]["tool.runs.health"] >= 1
+    assert client.get("/modules/jobs/nope").status_code == 404
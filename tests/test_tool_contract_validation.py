@@ -1,4 +1,4 @@
-from app.modules.contract import validate_tool_definition
+from app.modules.contract import validate_module_source, validate_tool_definition
 
 
 def test_tool_definition_requires_contract_fields():
@@ -23,3 +23,33 @@ def test_tool_definition_rejects_mock_true():
     out = validate_tool_definition(td)
     assert out.ok is False
     assert any("mock tools are not allowed" in i.message for i in out.issues)
+
+
+def test_static_validation_reads_literal_without_importing():
+    source = '''
+raise RuntimeError("top-level code must not run")
+
+TOOL_DEFINITION = {
+    "id": "x",
+    "name": "X",
+    "description": "d",
+    "version": "0.1.0",
+    "ralph_loop": True,
+    "allow_network": "none",
+    "allow_filesystem": "none",
+    "input_schema": {"type": "object", "properties": {}},
+}
+
+
+def run(payload):
+    return payload
+'''
+    assert validate_module_source(source).ok is True
+
+
+def test_static_validation_requires_literal_and_run():
+    out = validate_module_source("TOOL_DEFINITION = dict(id='x')\n")
+    messages = "\n".join(i.message for i in out.issues)
+    assert out.ok is False
+    assert "must be a literal dict" in messages
+    assert "missing callable run" in messages
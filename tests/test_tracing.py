@@ -0,0 +1,69 @@
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app.main import app
+
+
+class _Collect:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+def test_sampled_tool_run_records_ralph_phases(monkeypatch, tmp_path):
+    sink = _Collect()
+    tracing.set_exporter(sink)
+    monkeypatch.setenv("KIT_TRACE_SAMPLE_RATE", "1")
+    try:
+        resp = TestClient(app).post("/modules/run/fs", json={"path": str(tmp_path)})
+    finally:
+        tracing.set_exporter(None)
+
+    assert resp.status_code == 200
+    assert "Server-Timing" in resp.headers
+    names = {s.name for s in sink.spans}
+    assert {"http.request", "registry.discover", "registry.run_tool", "ralph.observe", "ralph.verify"} <= names
+    assert len({s.trace_id for s in sink.spans}) == 1
+
+
+def test_unsampled_span_is_noop(monkeypatch):
+    monkeypatch.setenv("KIT_TRACE_SAMPLE_RATE", "0")
+    with tracing.trace_request("root") as root:
+        with tracing.span("child") as sp:
+            assert sp is None
+    assert root is None
+
+
+def test_profile_header_attaches_summary(monkeypatch, tmp_path):
+    tracing.set_exporter(tracing.NullExporter())
+    monkeypatch.setenv("KIT_PROFILING_ENABLED", "1")
+    try:
+        resp = TestClient(app).post(
+            "/modules/run/fs",
+            json={"path": str(tmp_path)},
+            headers={"X-Kit-Profile": "cprofile"},
+        )
+    finally:
+        tracing.set_exporter(None)
+
+    assert resp.headers[tracing.PROFILE_SUMMARY_HEADER].startswith("cprofile;")
+
+
+def test_bad_sample_interval_falls_back(monkeypatch, tmp_path):
+    tracing.set_exporter(tracing.NullExporter())
+    monkeypatch.setenv("KIT_PROFILING_ENABLED", "1")
+    monkeypatch.setenv("KIT_PROFILE_SAMPLE_INTERVAL_MS", "fast")
+    try:
+        resp = TestClient(app).post(
+            "/modules/run/fs",
+            json={"path": str(tmp_path)},
+            headers={"X-Kit-Profile": "sample"},
+        )
+    finally:
+        tracing.set_exporter(None)
+
+    assert resp.status_code == 200
+    # "sample n=..." or "sample: no samples" on a run shorter than one tick.
+    assert resp.headers[tracing.PROFILE_SUMMARY_HEADER].startswith("sample")